@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+#******************************************************************************
+# benchutil.py, provides shared setup and timing for the benchmark scripts
+#
+# TreeLine, an information storage program
+# Copyright (C) 2025, Douglas W. Bell
+#
+# This is free software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License, either Version 2 or any later
+# version.  This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY.  See the included LICENSE file for details.
+#******************************************************************************
+
+"""Shared setup for the benchmark scripts in this directory.
+
+Import this module before any TreeLine module.  It adds the source
+directory to the path, starts an offscreen QApplication and sets default
+options, without reading or changing the user's config files.
+
+The TREELINE_SOURCE environment variable can point to another source
+directory, such as a git worktree of an older commit, so the same script
+can time the code before and after a change.
+"""
+
+import sys
+import os
+import time
+import builtins
+import pathlib
+
+sourcePath = pathlib.Path(os.environ.get('TREELINE_SOURCE', '') or
+                          pathlib.Path(__file__).resolve().parent.parent /
+                          'source')
+sys.path.insert(0, str(sourcePath))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+def _markNoTranslate(text, comment=''):
+    """Dummy translation function, returns the text unchanged.
+
+    Arguments:
+        text -- the text to be translated
+        comment -- a comment used only as a guide for translators
+    """
+    return text
+
+builtins._ = _markNoTranslate
+builtins.N_ = _markNoTranslate
+
+from PyQt6.QtWidgets import QApplication
+app = QApplication.instance() or QApplication(sys.argv[:1])
+
+import globalref
+import options
+import optiondefaults
+
+globalref.localTextEncoding = 'utf-8'
+globalref.genOptions = options.Options()
+optiondefaults.setGenOptionDefaults(globalref.genOptions)
+globalref.miscOptions = options.Options()
+optiondefaults.setMiscOptionDefaults(globalref.miscOptions)
+
+
+def bestTime(func, repeat=3):
+    """Run a function several times, return the best time and the result.
+
+    Arguments:
+        func -- the function to call without arguments
+        repeat -- the number of runs
+    """
+    bestSeconds = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start
+        if bestSeconds is None or seconds < bestSeconds:
+            bestSeconds = seconds
+    return bestSeconds, result
+
+def printHeader(title):
+    """Print a benchmark title with the source directory being timed.
+
+    Arguments:
+        title -- the benchmark description
+    """
+    print('{0}  (source: {1})'.format(title, sourcePath))
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+#******************************************************************************
+# clonespots.py, benchmarks tree expand and scroll with many cloned nodes
+#
+# TreeLine, an information storage program
+# Copyright (C) 2025, Douglas W. Bell
+#
+# This is free software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License, either Version 2 or any later
+# version.  This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY.  See the included LICENSE file for details.
+#******************************************************************************
+
+"""Time spot lookups in a tree with one branch cloned under many parents.
+
+Usage: python3 clonespots.py [number of clone parents, default 10000]
+
+The expand walk visits every spot, like expanding the whole tree view.
+The scroll pass looks up the model index data (matched spot and row) for
+every visible row.  Both are also run with the old linear scan of a node's
+spot refs for comparison.  Spot ID round trips cover the saved tree state.
+"""
+
+import sys
+import benchutil
+import treeformats
+import treenode
+import treestructure
+
+
+def scanMatchedSpot(node, parentSpot):
+    """Return the spot matching a parent spot with a linear scan (old code).
+
+    Arguments:
+        node -- the node to search
+        parentSpot -- the parent spot to match
+    """
+    for spot in node.spotRefs:
+        if spot.parentSpot is parentSpot:
+            return spot
+    return None
+
+def buildTree(numParents):
+    """Return a structure with one three-child branch cloned under parents.
+
+    Arguments:
+        numParents -- the number of top-level parents of the clone
+    """
+    nodeFormat = (treeformats.TreeFormats(setDefault=True)
+                  [treeformats.defaultTypeName])
+    shared = treenode.TreeNode(nodeFormat)
+    shared.childList = [treenode.TreeNode(nodeFormat) for i in range(3)]
+    parents = []
+    for i in range(numParents):
+        parent = treenode.TreeNode(nodeFormat)
+        parent.childList = [shared]
+        parents.append(parent)
+    return treestructure.TreeStructure(topNodes=parents), shared
+
+def expandWalk(structure, matchFunc):
+    """Visit every spot depth first and return the count.
+
+    Arguments:
+        structure -- the tree structure
+        matchFunc -- a function(node, parentSpot) returning the child spot
+    """
+    count = 0
+    stack = [structure.structSpot()]
+    while stack:
+        spot = stack.pop()
+        count += 1
+        stack.extend([matchFunc(child, spot) for child in
+                      spot.nodeRef.childList])
+    return count
+
+def scrollPass(structure, matchFunc):
+    """Look up the spot and row of every row in an expanded view.
+
+    Arguments:
+        structure -- the tree structure
+        matchFunc -- a function(node, parentSpot) returning the child spot
+    """
+    rows = 0
+    for topSpot in structure.rootSpots():
+        for child in topSpot.nodeRef.childList:
+            spot = matchFunc(child, topSpot)
+            rows += spot.row() + 1
+            for grandchild in child.childList:
+                rows += matchFunc(grandchild, spot).row() + 1
+    return rows
+
+
+def main():
+    """Build the tree and print the timings.
+    """
+    numParents = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    benchutil.printHeader('Clone spot lookups with {0} clone parents'.
+                          format(numParents))
+    structure, shared = buildTree(numParents)
+    newMatch = treenode.TreeNode.matchedSpot
+    for name, func in (('expand walk', expandWalk),
+                       ('scroll pass', scrollPass)):
+        newTime, newCount = benchutil.bestTime(lambda: func(structure,
+                                                            newMatch))
+        oldTime, oldCount = benchutil.bestTime(lambda: func(structure,
+                                                            scanMatchedSpot),
+                                               1)
+        assert newCount == oldCount
+        print('  {0:12} parent spot dict {1:8.3f} s   linear scan {2:8.3f} s'.
+              format(name, newTime, oldTime))
+    def spotIdRoundTrip():
+        for spot in shared.spotRefs:
+            assert structure.spotById(spot.spotId()) is spot
+    seconds, result = benchutil.bestTime(spotIdRoundTrip)
+    print('  spotId + spotById on {0} clone spots {1:8.3f} s'.
+          format(len(shared.spotRefs), seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+
+#******************************************************************************
+# dbsave.py, checks incremental database saves after tree changes
+#
+# TreeLine, an information storage program
+# Copyright (C) 2025, Douglas W. Bell
+#
+# This is free software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License, either Version 2 or any later
+# version.  This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY.  See the included LICENSE file for details.
+#******************************************************************************
+
+"""Compare incremental database saves with full saves of a math file.
+
+Usage: python3 dbsave.py [TreeLine file, default the math fields sample]
+
+The file is saved to a database, then number fields are edited one at a
+time.  After each edit the math fields are updated and the changes are
+written incrementally, as a database file save does.  The database must
+then read back the same as a full save of the tree.  The next step changes
+the zero blanks setting, which recalculates the whole tree.  The last steps
+rename and remove text fields without undo objects, as undo and redo
+restore formats, and save as a database file save does.
+"""
+
+import sys
+import json
+import pathlib
+import tempfile
+import benchutil
+import sqlitestore
+import treelocalcontrol
+import treestructure
+
+_samplePath = (pathlib.Path(__file__).resolve().parent.parent / 'samples' /
+               '330en_sample_math_fields.trln')
+
+
+class MathControl:
+    """Stand-in local control with only the math update methods.
+    """
+    updateMathFields = treelocalcontrol.TreeLocalControl.updateMathFields
+    updateAllMathFields = treelocalcontrol.TreeLocalControl.\
+                          updateAllMathFields
+    def __init__(self, structure):
+        """Store the structure to be recalculated.
+
+        Arguments:
+            structure -- the tree structure
+        """
+        self.structure = structure
+
+
+def numberEdits(structure):
+    """Return a list of (node, field name, new value) number field edits.
+
+    Arguments:
+        structure -- the tree structure
+    """
+    edits = []
+    for node in sorted(structure.nodeDict.values(),
+                       key=lambda node: node.title()):
+        for field in node.formatRef.fields():
+            if field.typeName == 'Number' and node.data.get(field.name):
+                value = str(float(node.data[field.name]) * 2 + 1)
+                edits.append((node, field.name, value))
+    return edits
+
+def fieldEdits(structure):
+    """Return a list of (description, function) text field changes.
+
+    The changes replace the formats without adding undo objects.
+    Arguments:
+        structure -- the tree structure
+    """
+    typeName = max(structure.nodesByType().items(),
+                   key=lambda item: len(item[1]))[0]
+    textNames = [field.name for field in
+                 structure.treeFormats[typeName].fields() if
+                 field.typeName == 'Text']
+    def renameField():
+        formats = structure.getConfigDialogFormats(True)
+        oldName = textNames[-1]
+        newName = oldName + 'Renamed'
+        for nodeFormat in ([formats[typeName]] +
+                           formats[typeName].derivedTypes):
+            fieldNames = nodeFormat.fieldNames()
+            fieldNames[fieldNames.index(oldName)] = newName
+            field = nodeFormat.fieldDict[oldName]
+            field.name = newName
+            nodeFormat.fieldDict[newName] = field
+            nodeFormat.reorderFields(fieldNames)
+            renameDict = formats.fieldRenameDict.setdefault(nodeFormat.name,
+                                                            {})
+            renameDict[oldName] = newName
+        structure.applyConfigDialogFormats(False)
+    def removeField():
+        formats = structure.getConfigDialogFormats(True)
+        for nodeFormat in ([formats[typeName]] +
+                           formats[typeName].derivedTypes):
+            field = nodeFormat.fieldDict[textNames[0]]
+            nodeFormat.removeField(field)
+            del nodeFormat.fieldDict[field.name]
+        formats.updateDerivedRefs()
+        structure.applyConfigDialogFormats(False)
+    edits = []
+    if len(textNames) > 1:
+        edits.append(('{0} {1} renamed'.format(typeName, textNames[-1]),
+                      renameField))
+    if textNames:
+        edits.append(('{0} {1} removed'.format(typeName, textNames[0]),
+                      removeField))
+    return edits
+
+def saveDatabase(pathObj, structure):
+    """Save the changes as a database file save does, after a data purge.
+
+    Returns True if the changes were written incrementally.
+    Arguments:
+        pathObj -- the path object of the database to update
+        structure -- the tree structure to save
+    """
+    # older source trees always update incrementally
+    if getattr(structure, 'fullSaveNeeded', False):
+        sqlitestore.writeFileData(pathObj, structure.fileData())
+        structure.clearChanges()
+        return False
+    sqlitestore.updateFileData(pathObj, structure.journalData())
+    return True
+
+def compareDatabase(pathObj, structure):
+    """Return a list of node IDs whose database records differ from the tree.
+
+    Arguments:
+        pathObj -- the path object of the database to read
+        structure -- the tree structure to compare
+    """
+    dbData = sqlitestore.readFileData(pathObj)
+    dbNodes = {record['uid']: record for record in dbData['nodes']}
+    treeNodes = {record['uid']: record for record in
+                 structure.fileData()['nodes']}
+    return sorted(uId for uId in set(dbNodes) | set(treeNodes) if
+                  dbNodes.get(uId) != treeNodes.get(uId))
+
+
+def main():
+    """Run the edits and print the check results.
+    """
+    pathObj = pathlib.Path(sys.argv[1]) if len(sys.argv) > 1 else _samplePath
+    benchutil.printHeader('Incremental database saves of {0}'.
+                          format(pathObj.name))
+    with pathObj.open('r', encoding='utf-8') as f:
+        structure = treestructure.TreeStructure(json.load(f))
+    control = MathControl(structure)
+    control.updateMathFields()
+    failures = 0
+    with tempfile.TemporaryDirectory() as tempDir:
+        dbPathObj = pathlib.Path(tempDir) / 'incremental.trlndb'
+        sqlitestore.writeFileData(dbPathObj, structure.fileData())
+        structure.clearChanges()
+        edits = numberEdits(structure)
+        numSaves = len(edits) + 1
+        # the None edit toggles the zero blanks setting
+        for node, fieldName, value in edits + [(None, '', '')]:
+            if node:
+                description = '{0} {1}'.format(node.title(), fieldName)
+                structure.markChanged([node])
+                node.data[fieldName] = value
+            else:
+                description = 'zero blanks setting'
+                structure.mathZeroBlanks = not structure.mathZeroBlanks
+            control.updateMathFields()
+            numChanged = len(structure.changedIds)
+            sqlitestore.updateFileData(dbPathObj, structure.journalData())
+            badIds = compareDatabase(dbPathObj, structure)
+            failures += bool(badIds)
+            print('  {0:36} {1:3} changed records   {2}'.
+                  format(description, numChanged,
+                         'stale: {0}'.format(len(badIds)) if badIds
+                         else 'ok'))
+        for description, editFunc in fieldEdits(structure):
+            editFunc()
+            control.updateMathFields()
+            structure.purgeOldFieldData()
+            numChanged = len(structure.changedIds)
+            incremental = saveDatabase(dbPathObj, structure)
+            badIds = compareDatabase(dbPathObj, structure)
+            failures += bool(badIds)
+            print('  {0:36} {1:3} changed records   {2} {3}'.
+                  format(description, numChanged,
+                         'incremental' if incremental else 'full',
+                         'stale: {0}'.format(len(badIds)) if badIds
+                         else 'ok'))
+            numSaves += 1
+    print('  {0} of {1} database saves differ from a full save'.
+          format(failures, numSaves))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+
+#******************************************************************************
+# fieldvalues.py, benchmarks sorting, filtering and math with date fields
+#
+# TreeLine, an information storage program
+# Copyright (C) 2025, Douglas W. Bell
+#
+# This is free software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License, either Version 2 or any later
+# version.  This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY.  See the included LICENSE file for details.
+#******************************************************************************
+
+"""Time field sorts, filters and math values on a generated math tree.
+
+Usage: python3 fieldvalues.py [groups, default 100] [items, default 1000]
+
+The tree has a root, the given number of groups and the given number of
+items per group, with Date, Number and Math fields.  Random values use a
+fixed seed, so runs are repeatable.  The traced memory after a full math
+recalculation is printed, along with the size of the parsed date value
+cache after reading the Due field.  Set TREELINE_SOURCE to an older source
+directory to compare.
+"""
+
+import sys
+import gc
+import random
+import tracemalloc
+import uuid
+import benchutil
+import conditional
+import fieldformat
+import treelocalcontrol
+import treestructure
+
+
+class MathControl:
+    """Stand-in local control with only the math recalculation method.
+    """
+    updateAllMathFields = treelocalcontrol.TreeLocalControl.\
+                          updateAllMathFields
+    def __init__(self, structure):
+        """Store the structure to be recalculated.
+
+        Arguments:
+            structure -- the tree structure
+        """
+        self.structure = structure
+
+
+def fieldData(name, fieldType='Text', **kwargs):
+    """Return a field format dict for file data.
+
+    Arguments:
+        name -- the field name
+        fieldType -- the field type name
+        kwargs -- other field format settings
+    """
+    data = {'fieldname': name, 'fieldtype': fieldType}
+    data.update(kwargs)
+    return data
+
+def formatData():
+    """Return the root, group and item format dicts for file data.
+    """
+    return [{'formatname': 'ROOT', 'childtype': 'GROUP',
+             'titleline': '{*Name*}', 'outputlines': ['{*Name*}'],
+             'fields': [fieldData('Name'), fieldData('Rate', 'Number'),
+                        fieldData('Total', 'Math', eqn='sum({*&Subtotal*})'),
+                        fieldData('Groups', 'Math', eqn='{*#Name*}'),
+                        fieldData('Start', 'Date', format='%Y-%m-%d')]},
+            {'formatname': 'GROUP', 'childtype': 'ITEM',
+             'titleline': '{*Name*}', 'outputlines': ['{*Name*}'],
+             'fields': [fieldData('Name'),
+                        fieldData('Subtotal', 'Math',
+                                  eqn='sum({*&Amount*})'),
+                        fieldData('Biggest', 'Math', eqn='max({*&Amount*})'),
+                        fieldData('Average', 'Math',
+                                  eqn='mean({*&Amount*})'),
+                        fieldData('Items', 'Math', eqn='{*#Name*}'),
+                        fieldData('Share', 'Math',
+                                  eqn='{*Subtotal*} / {**Total*} * 100')]},
+            {'formatname': 'ITEM', 'titleline': '{*Name*}',
+             'outputlines': ['{*Name*}'],
+             'fields': [fieldData('Name'), fieldData('Qty', 'Number'),
+                        fieldData('Price', 'Number'),
+                        fieldData('Due', 'Date', format='%Y-%m-%d'),
+                        fieldData('Amount', 'Math',
+                                  eqn='{*Qty*} * {*Price*} * '
+                                      '(1 + {*$Rate*} / 100)'),
+                        fieldData('Late', 'Math', eqn='{*Due*} + 30',
+                                  resulttype='date'),
+                        fieldData('Big', 'Math',
+                                  eqn='{*Amount*} > {**Average*}',
+                                  resulttype='boolean')]}]
+
+def buildTree(numGroups, numItems):
+    """Return a structure with a root, groups and items with random values.
+
+    Arguments:
+        numGroups -- the number of groups under the root
+        numItems -- the number of items in each group
+    """
+    random.seed(7)
+    newId = lambda: uuid.UUID(int=random.getrandbits(128)).hex
+    nodeList = []
+    groupIds = []
+    for groupNum in range(numGroups):
+        itemIds = []
+        for itemNum in range(numItems):
+            data = {'Name': 'item{0}_{1}'.format(groupNum, itemNum),
+                    'Qty': str(random.randint(-5, 40)),
+                    'Price': '{0:.2f}'.format(random.uniform(0, 100)),
+                    'Due': '2024-{0:02d}-{1:02d}'.
+                           format(random.randint(1, 12),
+                                  random.randint(1, 28))}
+            if random.random() < 0.05:
+                del data['Qty']
+            itemIds.append(newId())
+            nodeList.append({'uid': itemIds[-1], 'format': 'ITEM',
+                             'data': data, 'children': []})
+        groupIds.append(newId())
+        nodeList.append({'uid': groupIds[-1], 'format': 'GROUP',
+                         'data': {'Name': 'group{0}'.format(groupNum)},
+                         'children': itemIds})
+    rootId = newId()
+    nodeList.append({'uid': rootId, 'format': 'ROOT',
+                     'data': {'Name': 'root', 'Rate': '7.5',
+                              'Start': '2024-01-01'},
+                     'children': groupIds})
+    fileData = {'formats': formatData(), 'nodes': nodeList,
+                'properties': {'topnodes': [rootId]}}
+    return treestructure.TreeStructure(fileData)
+
+def sortFunc(structure, fieldName):
+    """Return a function that sorts the whole tree by an item field.
+
+    Arguments:
+        structure -- the tree structure
+        fieldName -- the item field to sort by
+    """
+    itemFormat = structure.treeFormats['ITEM']
+    def sortTree():
+        for field in itemFormat.fields():
+            field.sortKeyNum = 0
+        itemFormat.fieldDict[fieldName].sortKeyNum = 1
+        itemFormat.sortFields = []
+        root = structure.childList[0]
+        root.sortChildrenByField(True, True)
+        return root.childList[0].childList[0].data['Name']
+    return sortTree
+
+def filterFunc(items, conditionStr):
+    """Return a function that counts the items matching a condition.
+
+    Arguments:
+        items -- a list of item nodes
+        conditionStr -- the filter condition string
+    """
+    condition = conditional.Conditional(conditionStr)
+    return lambda: sum(1 for node in items if condition.evaluate(node))
+
+def mathValueFunc(structure, items, fieldName):
+    """Return a function that sums the math values of an item field.
+
+    Arguments:
+        structure -- the tree structure
+        items -- a list of item nodes
+        fieldName -- the item field to use
+    """
+    field = structure.treeFormats['ITEM'].fieldDict[fieldName]
+    return lambda: sum(field.mathValue(node) or 0 for node in items if
+                       node.data.get(fieldName))
+
+
+def main():
+    """Build the tree and print the timings and memory use.
+    """
+    numGroups = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    numItems = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    benchutil.printHeader('Field values with {0} x {1} items'.
+                          format(numGroups, numItems))
+    gc.collect()
+    tracemalloc.start()
+    structure = buildTree(numGroups, numItems)
+    control = MathControl(structure)
+    control.updateAllMathFields()
+    gc.collect()
+    print('  traced memory after full recalc {0:7.1f} MB'.
+          format(tracemalloc.get_traced_memory()[0] / 1e6))
+    tracemalloc.stop()
+    items = [node for node in structure.nodeDict.values() if
+             node.formatRef.name == 'ITEM']
+    tests = [('sort Due', sortFunc(structure, 'Due')),
+             ('sort Qty', sortFunc(structure, 'Qty')),
+             ('filter Due', filterFunc(items, 'Due < "2024-06-01"')),
+             ('filter Qty', filterFunc(items, 'Qty >= "20"')),
+             ('filter Due range + Qty',
+              filterFunc(items, 'Due >= "2024-03-01" and '
+                                'Due < "2024-09-01" and Qty > "5"')),
+             ('mathValue Due', mathValueFunc(structure, items, 'Due')),
+             ('mathValue Qty', mathValueFunc(structure, items, 'Qty')),
+             ('math recalc (warm)', control.updateAllMathFields)]
+    for name, func in tests:
+        seconds, result = benchutil.bestTime(func)
+        print('  {0:24} {1:7.3f} s   {2}'.format(name, seconds, result))
+    # refill the emptied date value cache while tracing to find its size
+    dateValue = fieldformat._dateValue
+    if hasattr(dateValue, 'cache_clear'):
+        dateValue.cache_clear()
+    gc.collect()
+    tracemalloc.start()
+    mathValueFunc(structure, items, 'Due')()
+    gc.collect()
+    cacheSize = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    numEntries = (dateValue.cache_info().currsize if
+                  hasattr(dateValue, 'cache_info') else 0)
+    print('  date value cache {0:8.2f} MB   {1} entries'.
+          format(cacheSize / 1e6, numEntries))
+
+
+if __name__ == '__main__':
+    main()
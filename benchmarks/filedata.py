@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+#******************************************************************************
+# filedata.py, benchmarks building the file data for saves
+#
+# TreeLine, an information storage program
+# Copyright (C) 2025, Douglas W. Bell
+#
+# This is free software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License, either Version 2 or any later
+# version.  This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY.  See the included LICENSE file for details.
+#******************************************************************************
+
+"""Time TreeStructure.fileData with a copied data snapshot, as saves use it.
+
+Usage: python3 filedata.py [node counts, default 10000 100000 1000000]
+
+The trees use random uuid style IDs with 100 children per node and the
+formats from the long text sample file.  The old approach, sorting the
+built records by uid and then copying their data, is timed for
+comparison, and both results must be equal.
+"""
+
+import sys
+import json
+import uuid
+import random
+import operator
+import pathlib
+import benchutil
+import treestructure
+
+_samplePath = (pathlib.Path(__file__).resolve().parent.parent / 'samples' /
+               '110en_sample_basic_longtext.trln')
+
+
+def buildTree(numNodes, childrenPerNode=100):
+    """Return a structure with random IDs and a fixed number of children.
+
+    Arguments:
+        numNodes -- the number of nodes
+        childrenPerNode -- the number of children of each parent
+    """
+    with _samplePath.open('r', encoding='utf-8') as f:
+        sampleData = json.load(f)
+    formatName = sampleData['nodes'][0]['format']
+    random.seed(1)
+    nodeList = []
+    topNodes = []
+    for i in range(numNodes):
+        uId = uuid.UUID(int=random.getrandbits(128)).hex
+        nodeList.append({'format': formatName, 'uid': uId,
+                         'data': {'Name': 'Node {0}'.format(i)},
+                         'children': []})
+        if i < childrenPerNode:
+            topNodes.append(uId)
+        else:
+            parentRecord = nodeList[(i - childrenPerNode) // childrenPerNode]
+            parentRecord['children'].append(uId)
+    nodeList.sort(key=operator.itemgetter('uid'))
+    fileData = {'formats': sampleData['formats'], 'nodes': nodeList,
+                'properties': {'topnodes': topNodes}}
+    return treestructure.TreeStructure(fileData)
+
+def oldFileData(structure):
+    """Return file data built by sorting the records, with copied data.
+
+    Arguments:
+        structure -- the tree structure
+    """
+    formats = structure.treeFormats.storeFormats()
+    nodeList = sorted([node.fileData() for node in
+                       structure.nodeDict.values()],
+                      key=operator.itemgetter('uid'))
+    for nodeRecord in nodeList:
+        nodeRecord['data'] = nodeRecord['data'].copy()
+    return {'formats': formats, 'nodes': nodeList,
+            'properties': structure.fileProperties()}
+
+
+def main():
+    """Build the trees and print the timings.
+    """
+    counts = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    benchutil.printHeader('File data for saves')
+    for numNodes in counts:
+        structure = buildTree(numNodes)
+        newTime, newData = benchutil.bestTime(lambda:
+                                              structure.fileData(True))
+        oldTime, oldData = benchutil.bestTime(lambda:
+                                              oldFileData(structure))
+        assert newData == oldData, 'file data differs'
+        del newData, oldData
+        print('  {0:8} nodes   fileData {1:7.3f} s   record sort {2:7.3f} s'.
+              format(numNodes, newTime, oldTime))
+        del structure
+
+
+if __name__ == '__main__':
+    main()
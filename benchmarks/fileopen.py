@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+#******************************************************************************
+# fileopen.py, benchmarks reading and building large TreeLine files
+#
+# TreeLine, an information storage program
+# Copyright (C) 2025, Douglas W. Bell
+#
+# This is free software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License, either Version 2 or any later
+# version.  This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY.  See the included LICENSE file for details.
+#******************************************************************************
+
+"""Time the file open steps that run before the window is shown.
+
+Usage: python3 fileopen.py [number of nodes, default 500000]
+
+A file with 20 top nodes, 50 children each and the remaining nodes as
+grandchildren is written to a temporary directory.  It is read with the
+streaming JSON reader into a tree structure, which creates every node and
+spot, with the garbage collector paused as a file open does and with it
+running.  A deferred build, as used by file opens, is then timed until
+the top nodes can be shown and until all nodes are built.
+"""
+
+import sys
+import gc
+import json
+import pathlib
+import tempfile
+import benchutil
+import treestructure
+try:
+    import jsonstream
+except ImportError:
+    jsonstream = None   # older source trees read the whole file at once
+
+_samplePath = (pathlib.Path(__file__).resolve().parent.parent / 'samples' /
+               '110en_sample_basic_longtext.trln')
+
+
+def writeFile(pathObj, numNodes):
+    """Write a three-level file using the long text sample's formats.
+
+    Arguments:
+        pathObj -- the path object of the file to write
+        numNodes -- the approximate number of nodes
+    """
+    with _samplePath.open('r', encoding='utf-8') as f:
+        fileData = json.load(f)
+    formatName = fileData['nodes'][0]['format']
+    nodeList = []
+    def newRecord():
+        uId = '{0:032x}'.format(len(nodeList) * 2654435761 % (1 << 128))
+        nodeList.append({'format': formatName, 'uid': uId,
+                         'data': {'Name': 'Node {0}'.format(len(nodeList))},
+                         'children': []})
+        return nodeList[-1]
+    topNodes = []
+    for i in range(20):
+        topRecord = newRecord()
+        topNodes.append(topRecord['uid'])
+        for j in range(50):
+            childRecord = newRecord()
+            topRecord['children'].append(childRecord['uid'])
+            for k in range(max(0, numNodes // 1000 - 1)):
+                childRecord['children'].append(newRecord()['uid'])
+    fileData['nodes'] = nodeList
+    fileData['properties']['topnodes'] = topNodes
+    with pathObj.open('w', encoding='utf-8') as f:
+        json.dump(fileData, f, indent=0, sort_keys=True)
+
+def openFile(pathObj, pauseCollector, deferNodes=False):
+    """Read the file into a tree structure and return the structure.
+
+    Arguments:
+        pathObj -- the path object of the file to read
+        pauseCollector -- if True, disable the garbage collector while reading
+        deferNodes -- if True, build only the top nodes of the tree
+    """
+    if pauseCollector:
+        gc.disable()
+    try:
+        with pathObj.open('r', encoding='utf-8') as f:
+            fileData = (jsonstream.JsonStreamData(f) if jsonstream else
+                        json.load(f))
+            if deferNodes:
+                return treestructure.TreeStructure(fileData, deferNodes=True)
+            return treestructure.TreeStructure(fileData)
+    finally:
+        gc.enable()
+
+def finishBuild(structure):
+    """Build the rest of a deferred tree structure and return it.
+
+    Arguments:
+        structure -- the structure from a deferred open
+    """
+    gc.disable()
+    try:
+        structure.buildDeferredNodes()
+    finally:
+        gc.enable()
+    return structure
+
+def printResult(name, structure, seconds):
+    """Print the node and spot counts and the time for a structure.
+
+    Arguments:
+        name -- the name of the test
+        structure -- the tree structure
+        seconds -- the time taken
+    """
+    print('  {0:18} {1} nodes, {2} spots   {3:7.2f} s'.
+          format(name, len(structure.nodeDict),
+                 sum(len(node.spotRefs) for node in
+                     structure.nodeDict.values()), seconds))
+
+
+def main():
+    """Write the file and print the timings.
+    """
+    numNodes = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    benchutil.printHeader('File open with {0} nodes'.format(numNodes))
+    with tempfile.TemporaryDirectory() as tempDir:
+        pathObj = pathlib.Path(tempDir) / 'large.trln'
+        writeFile(pathObj, numNodes)
+        for name, pauseCollector in (('collector paused', True),
+                                     ('collector running', False)):
+            gc.collect()
+            seconds, structure = benchutil.bestTime(lambda:
+                                                    openFile(pathObj,
+                                                             pauseCollector),
+                                                    1)
+            printResult(name, structure, seconds)
+            del structure
+        if not hasattr(treestructure, 'deferMinNodes'):
+            return   # older source trees always build the full tree
+        gc.collect()
+        seconds, structure = benchutil.bestTime(lambda:
+                                                openFile(pathObj, True,
+                                                         True), 1)
+        printResult('deferred, shown', structure, seconds)
+        finishSeconds, structure = benchutil.bestTime(lambda:
+                                                      finishBuild(structure),
+                                                      1)
+        printResult('deferred, built', structure, seconds + finishSeconds)
+
+
+if __name__ == '__main__':
+    main()
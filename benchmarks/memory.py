@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+#******************************************************************************
+# memory.py, benchmarks the memory used by tree nodes and spots
+#
+# TreeLine, an information storage program
+# Copyright (C) 2025, Douglas W. Bell
+#
+# This is free software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License, either Version 2 or any later
+# version.  This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY.  See the included LICENSE file for details.
+#******************************************************************************
+
+"""Measure the memory per node for bundled files scaled up by copying.
+
+Usage: python3 memory.py [scale factor, default 1.0]
+
+Each file's nodes are copied with new unique IDs until the tree is large,
+then the structure is built while tracing memory allocations.  The traced
+total includes the node data dictionaries.  The sizes of single node and
+spot objects (plus any instance dictionary) are also printed.  Set
+TREELINE_SOURCE to an older source directory to compare.
+"""
+
+import sys
+import json
+import gc
+import time
+import tracemalloc
+import pathlib
+import benchutil
+import treenode
+import treespot
+import treestructure
+
+_topPath = pathlib.Path(__file__).resolve().parent.parent
+_scaledFiles = [(_topPath / 'doc' / 'documentation.trln', 200),
+                (_topPath / 'samples' / '220en_sample_bookmarks.trln', 3000),
+                (_topPath / 'samples' / '140en_sample_genealogy.trln', 2000)]
+
+
+def scaledFileData(path, copies):
+    """Return file data with the nodes and top nodes copied several times.
+
+    Arguments:
+        path -- the TreeLine file path to read
+        copies -- the number of copies of the tree
+    """
+    with path.open('r', encoding='utf-8') as f:
+        fileData = json.load(f)
+    nodes = []
+    topNodes = []
+    for i in range(copies):
+        suffix = '_{0}'.format(i)
+        for nodeData in fileData['nodes']:
+            newData = dict(nodeData)
+            newData['uid'] = nodeData['uid'] + suffix
+            newData['children'] = [uid + suffix for uid in
+                                   nodeData['children']]
+            newData['data'] = dict(nodeData['data'])
+            nodes.append(newData)
+        topNodes.extend(uid + suffix for uid in
+                        fileData['properties']['topnodes'])
+    fileData['nodes'] = nodes
+    fileData['properties']['topnodes'] = topNodes
+    return fileData
+
+def objectSize(obj):
+    """Return the size of an object plus its instance dictionary, if any.
+
+    Arguments:
+        obj -- the object to measure
+    """
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def main():
+    """Build the scaled trees and print the memory use.
+    """
+    scale = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    benchutil.printHeader('Node and spot memory')
+    node = treenode.TreeNode(None)
+    spot = treespot.TreeSpot(node, None)
+    print('  TreeNode object {0} bytes, TreeSpot object {1} bytes'.
+          format(objectSize(node), objectSize(spot)))
+    for path, copies in _scaledFiles:
+        copies = max(1, int(copies * scale))
+        fileData = scaledFileData(path, copies)
+        gc.collect()
+        tracemalloc.start()
+        start = time.perf_counter()
+        structure = treestructure.TreeStructure(fileData)
+        seconds = time.perf_counter() - start
+        del fileData
+        gc.collect()
+        traced = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        numNodes = len(structure.nodeDict)
+        numSpots = sum(len(node.spotRefs) for node in
+                       structure.nodeDict.values())
+        print('  {0} x{1}: {2} nodes, {3} spots, {4:.1f} MB, '
+              '{5:.0f} bytes/node, load {6:.2f} s (traced)'.
+              format(path.name, copies, numNodes, numSpots, traced / 1e6,
+                     traced / numNodes, seconds))
+        del structure
+        gc.collect()
+
+
+if __name__ == '__main__':
+    main()
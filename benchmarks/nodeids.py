@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+#******************************************************************************
+# nodeids.py, benchmarks new node ID allocation in bulk operations
+#
+# TreeLine, an information storage program
+# Copyright (C) 2025, Douglas W. Bell
+#
+# This is free software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License, either Version 2 or any later
+# version.  This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY.  See the included LICENSE file for details.
+#******************************************************************************
+
+"""Time node creation and imports with new and old style node IDs.
+
+Usage: python3 nodeids.py [number of nodes, default 100000]
+
+The old style replaces treenode.newNodeId with a uuid1 call per node, as
+used before the session prefix and counter.  The tabbed text and CSV
+input files are generated in a temporary directory.
+"""
+
+import sys
+import uuid
+import pathlib
+import tempfile
+import benchutil
+import treeformats
+import treenode
+import imports
+
+
+def oldNodeId():
+    """Return a new node ID from a uuid (old code).
+    """
+    return uuid.uuid1().hex
+
+def writeTabbedText(path, numNodes):
+    """Write a three-level tab indented text file.
+
+    Arguments:
+        path -- the path object to write
+        numNodes -- the approximate number of nodes
+    """
+    lines = []
+    for i in range(max(1, numNodes // 500)):
+        lines.append('Top {0}'.format(i))
+        for j in range(20):
+            lines.append('\tMid {0} {1}'.format(i, j))
+            for k in range(24):
+                lines.append('\t\tLeaf {0} {1} {2}'.format(i, j, k))
+    path.write_text('\n'.join(lines), encoding='utf-8')
+
+def writeCsv(path, numNodes):
+    """Write a CSV table with a header row.
+
+    Arguments:
+        path -- the path object to write
+        numNodes -- the number of table rows
+    """
+    lines = ['Name,Value,Other']
+    lines.extend('n{0},{0},x{0}'.format(i) for i in range(numNodes))
+    path.write_text('\n'.join(lines), encoding='utf-8')
+
+
+def main():
+    """Write the input files and print the timings.
+    """
+    numNodes = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    benchutil.printHeader('New node IDs with {0} nodes'.format(numNodes))
+    nodeFormat = (treeformats.TreeFormats(setDefault=True)
+                  [treeformats.defaultTypeName])
+    with tempfile.TemporaryDirectory() as tempDir:
+        textPath = pathlib.Path(tempDir) / 'tabbed.txt'
+        writeTabbedText(textPath, numNodes)
+        csvPath = pathlib.Path(tempDir) / 'table.csv'
+        writeCsv(csvPath, numNodes)
+        tests = [('new TreeNode', lambda: [treenode.TreeNode(nodeFormat) for
+                                           i in range(numNodes)]),
+                 ('importTabbedText', lambda: imports.ImportControl(textPath).
+                  importTabbedText().nodeDict),
+                 ('importTableCsv', lambda: imports.ImportControl(csvPath).
+                  importTableCsv().nodeDict)]
+        newIdFunc = treenode.newNodeId
+        for name, func in tests:
+            newTime, newNodes = benchutil.bestTime(func)
+            treenode.newNodeId = oldNodeId
+            try:
+                oldTime, oldNodes = benchutil.bestTime(func)
+            finally:
+                treenode.newNodeId = newIdFunc
+            assert len(newNodes) == len(oldNodes)
+            print('  {0:16} {1} nodes   counter IDs {2:7.3f} s   '
+                  'uuid1 IDs {3:7.3f} s'.format(name, len(newNodes),
+                                                newTime, oldTime))
+
+
+if __name__ == '__main__':
+    main()
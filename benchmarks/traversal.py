@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+
+#******************************************************************************
+# traversal.py, benchmarks the tree traversal generators
+#
+# TreeLine, an information storage program
+# Copyright (C) 2025, Douglas W. Bell
+#
+# This is free software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License, either Version 2 or any later
+# version.  This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY.  See the included LICENSE file for details.
+#******************************************************************************
+
+"""Compare the explicit-stack generators with the old recursive ones.
+
+Usage: python3 traversal.py
+
+Runs on synthetic deep trees (single chains) and a wide tree.  The old
+recursive generators are copied here for comparison.  Both versions must
+yield the same items in the same order.  Deep trees that exceed the
+recursion limit are reported instead of timed for the old versions.
+"""
+
+import sys
+import benchutil
+import treeformats
+import treenode
+import treestructure
+
+
+class ExpandedView:
+    """Stand-in tree view with every spot expanded.
+    """
+    def isSpotExpanded(self, spot):
+        """Return True for every spot.
+
+        Arguments:
+            spot -- the spot to check
+        """
+        return True
+
+
+def oldDescendantGen(node):
+    """Return the old recursive node generator, including the node.
+
+    Arguments:
+        node -- the top node of the branch
+    """
+    yield node
+    for child in node.childList:
+        for descend in oldDescendantGen(child):
+            yield descend
+
+def oldSpotDescendantGen(spot):
+    """Return the old recursive spot generator, including the spot.
+
+    Arguments:
+        spot -- the top spot of the branch
+    """
+    yield spot
+    for childSpot in spot.childSpots():
+        for descend in oldSpotDescendantGen(childSpot):
+            yield descend
+
+def oldExpandedSpotDescendantGen(spot, treeView):
+    """Return the old recursive expanded spot generator, without the spot.
+
+    Arguments:
+        spot -- the top spot of the branch
+        treeView -- the view to check for expanded spots
+    """
+    for childSpot in spot.childSpots():
+        if treeView.isSpotExpanded(childSpot):
+            yield childSpot
+            for descend in oldExpandedSpotDescendantGen(childSpot, treeView):
+                yield descend
+
+def oldLevelSpotDescendantGen(spot, treeView, includeRoot=True, maxLevel=None,
+                              openOnly=False, initLevel=0):
+    """Return the old recursive generator of (spot, level) tuples.
+
+    Arguments:
+        spot -- the top spot of the branch
+        treeView -- the view to check for expanded spots
+        includeRoot -- if True, the root spot is included
+        maxLevel -- the max number of levels to return (no limit if none)
+        openOnly -- if True, only include children open in the given view
+        initLevel -- the level number to start with
+    """
+    if maxLevel == None:
+        maxLevel = sys.maxsize
+    if includeRoot:
+        yield (spot, initLevel)
+        initLevel += 1
+    if initLevel < maxLevel and (not openOnly or
+                                 treeView.isSpotExpanded(spot)):
+        for childSpot in spot.childSpots():
+            for item in oldLevelSpotDescendantGen(childSpot, treeView, True,
+                                                  maxLevel, openOnly,
+                                                  initLevel):
+                yield item
+
+def deepTree(nodeFormat, depth):
+    """Return a structure with a single chain of nodes.
+
+    Arguments:
+        nodeFormat -- the node format to use
+        depth -- the number of nodes in the chain
+    """
+    top = node = treenode.TreeNode(nodeFormat)
+    for i in range(depth - 1):
+        child = treenode.TreeNode(nodeFormat)
+        node.childList.append(child)
+        node = child
+    return treestructure.TreeStructure(topNodes=[top])
+
+def wideTree(nodeFormat, numNodes, width=100):
+    """Return a structure with a wide, two-level branch under one top node.
+
+    Arguments:
+        nodeFormat -- the node format to use
+        numNodes -- the approximate number of nodes
+        width -- the number of children under each middle node
+    """
+    top = treenode.TreeNode(nodeFormat)
+    for i in range(numNodes // width):
+        child = treenode.TreeNode(nodeFormat)
+        child.childList = [treenode.TreeNode(nodeFormat) for j in
+                           range(width)]
+        top.childList.append(child)
+    return treestructure.TreeStructure(topNodes=[top])
+
+def compare(name, newFunc, oldFunc):
+    """Time both versions of a generator and print the results.
+
+    Arguments:
+        name -- the generator name to print
+        newFunc -- a function returning a list from the current generator
+        oldFunc -- a function returning a list from the old generator
+    """
+    newTime, newItems = benchutil.bestTime(newFunc)
+    try:
+        oldTime, oldItems = benchutil.bestTime(oldFunc)
+    except RecursionError:
+        oldText = 'RecursionError'
+    else:
+        assert oldItems == newItems, 'yield order differs'
+        oldText = '{0:8.3f} s'.format(oldTime)
+    print('    {0:28} stack {1:8.3f} s   recursive {2}'.format(name, newTime,
+                                                                oldText))
+
+
+def main():
+    """Build the trees and print the timings.
+    """
+    benchutil.printHeader('Tree traversal generators')
+    nodeFormat = (treeformats.TreeFormats(setDefault=True)
+                  [treeformats.defaultTypeName])
+    view = ExpandedView()
+    trees = [('deep {0}'.format(depth), deepTree(nodeFormat, depth)) for
+             depth in (200, 900, 5000)]
+    trees.append(('wide 100k', wideTree(nodeFormat, 100000)))
+    for treeName, structure in trees:
+        print('  {0} ({1} nodes, recursion limit {2})'.
+              format(treeName, len(structure.nodeDict),
+                     sys.getrecursionlimit()))
+        top = structure.childList[0]
+        topSpot = structure.rootSpots()[0]
+        compare('descendantGen', lambda: list(top.descendantGen()),
+                lambda: list(oldDescendantGen(top)))
+        compare('spotDescendantGen', lambda: list(topSpot.spotDescendantGen()),
+                lambda: list(oldSpotDescendantGen(topSpot)))
+        compare('expandedSpotDescendantGen',
+                lambda: list(topSpot.expandedSpotDescendantGen(view)),
+                lambda: list(oldExpandedSpotDescendantGen(topSpot, view)))
+        compare('levelSpotDescendantGen',
+                lambda: list(topSpot.levelSpotDescendantGen(view)),
+                lambda: list(oldLevelSpotDescendantGen(topSpot, view)))
+
+
+if __name__ == '__main__':
+    main()
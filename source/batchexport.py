@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+
+#******************************************************************************
+# batchexport.py, provides headless command line file exports
+#
+# TreeLine, an information storage program
+# Copyright (C) 2025, Douglas W. Bell
+#
+# This is free software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License, either Version 2 or any later
+# version.  This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY.  See the included LICENSE file for details.
+#******************************************************************************
+
+import sys
+import os
+import io
+import gc
+import gzip
+import zlib
+from PyQt6.QtWidgets import QApplication
+import globalref
+import options
+import optiondefaults
+import treestructure
+import treemaincontrol
+import printdata
+import jsonstream
+import sqlitestore
+import p3
+import exports
+
+exitOK = 0
+exitUsageError = 2
+exitReadError = 3
+exitWriteError = 4
+
+passwordEnvName = 'TREELINE_PASSWORD'
+# these export types write into a directory instead of a file
+_directoryTypes = {'htmlPages', 'htmlTables', 'htmlLiveLink'}
+_liveTypes = {'htmlLiveLink', 'htmlLiveSingle'}
+_liveTemplateNames = ('live_tree_export.html', 'live_tree_export.js',
+                      'live_tree_export.css')
+
+
+class BatchControl:
+    """Stand-in for the main and local controls during a batch export.
+
+    Provides the file data, settings and resource lookups that the export
+    and condition code read from globalref.mainControl, without any windows.
+    """
+    # reuse the main control's resource searches, they only need these methods
+    findResourcePaths = treemaincontrol.TreeMainControl.findResourcePaths
+    findResourceFile = treemaincontrol.TreeMainControl.findResourceFile
+
+    def __init__(self, pathObj):
+        """Read the file and initialize the control.
+
+        Raises IOError if the file can't be read and ValueError if the file
+        is not a valid TreeLine file.
+        Arguments:
+            pathObj -- the path object of the file to export
+        """
+        self.activeControl = self
+        self.filePathObj = pathObj
+        self.printData = printdata.PrintData(self)
+        fileData = None
+        # pause the garbage collector while the nodes are created
+        gc.disable()
+        try:
+            if sqlitestore.isDatabase(pathObj):
+                fileData = sqlitestore.readFileData(pathObj)
+                self.structure = treestructure.TreeStructure(fileData)
+            else:
+                with pathObj.open('rb') as fileObj:
+                    fileObj = self.decodeFile(fileObj)
+                    with io.TextIOWrapper(fileObj,
+                                          encoding='utf-8') as textFile:
+                        fileData = jsonstream.JsonStreamData(textFile)
+                        self.structure = treestructure.TreeStructure(fileData)
+        except (KeyError, TypeError) as err:
+            raise ValueError(str(err))
+        finally:
+            gc.enable()
+        self.printData.readData(fileData['properties'])
+        fileInfoFormat = self.structure.treeFormats.fileInfoFormat
+        fileInfoFormat.updateFileInfo(pathObj, self.structure.fileInfoNode)
+
+    def decodeFile(self, fileObj):
+        """Return a binary file object with any encryption and compression
+        removed.
+
+        The password for encrypted files is read from an environment variable.
+        Raises ValueError if the password is missing or wrong.
+        Arguments:
+            fileObj -- the binary file object to decode
+        """
+        prefix = treemaincontrol.encryptPrefix
+        if fileObj.read(len(prefix)) == prefix:
+            password = os.environ.get(passwordEnvName, '')
+            if not password:
+                raise ValueError('encrypted file, set {0} to the password'.
+                                 format(passwordEnvName))
+            try:
+                fileObj = io.BytesIO(p3.p3_decrypt(fileObj.read(),
+                                                   password.encode()))
+            except p3.CryptError:
+                raise ValueError('incorrect password')
+        fileObj.seek(0)
+        if fileObj.read(2) == b'\037\213':
+            fileObj.seek(0)
+            try:
+                return gzip.GzipFile(fileobj=fileObj)
+            except zlib.error:
+                pass
+        fileObj.seek(0)
+        return fileObj
+
+
+class ConditionSelection:
+    """Stand-in selection model with the nodes that match a condition.
+    """
+    def __init__(self, structure, conditional=None):
+        """Find the matching spots in tree order.
+
+        Arguments:
+            structure -- the tree structure to search
+            conditional -- the Conditional to match, select nothing if None
+        """
+        self.spots = []
+        if conditional:
+            for rootSpot in structure.rootSpots():
+                for spot in rootSpot.spotDescendantGen():
+                    if conditional.evaluate(spot.nodeRef):
+                        self.spots.append(spot)
+
+    def selectedSpots(self):
+        """Return a list of the matching spots.
+        """
+        return self.spots[:]
+
+    def selectedNodes(self):
+        """Return a list of the matching nodes, without duplicate clones.
+        """
+        return list({spot.nodeRef.uId: spot.nodeRef for spot in
+                     self.spots}.values())
+
+
+def exportFile(args):
+    """Export a file using command line arguments and return an exit code.
+
+    Uses default options, so results do not depend on (or change) the user's
+    config files, and several exports can run at the same time.
+    Arguments:
+        args -- the parsed command line arguments
+    """
+    globalref.genOptions = options.Options()
+    optiondefaults.setGenOptionDefaults(globalref.genOptions)
+    globalref.miscOptions = options.Options()
+    optiondefaults.setMiscOptionDefaults(globalref.miscOptions)
+    subtype = args.export
+    dialog = exports.ExportDialog
+    subtypes = [name for names in dialog.exportSubtypes.values()
+                for name in names]
+    if subtype not in subtypes:
+        return _error(exitUsageError, 'unknown export type "{0}", use one '
+                      'of: {1}'.format(subtype, ', '.join(subtypes)))
+    if len(args.fileList) != 1 or not args.output:
+        return _error(exitUsageError, 'an export needs one input file and '
+                      'an --output path')
+    try:
+        control = BatchControl(args.fileList[0])
+    except (IOError, ValueError) as err:
+        return _error(exitReadError, 'could not read {0}: {1}'.
+                      format(args.fileList[0], err))
+    globalref.mainControl = control
+    structure = control.structure
+    if structure.childRefErrorNodes:
+        print('Warning - skipped bad child references in {0} nodes'.
+              format(len(structure.childRefErrorNodes)), file=sys.stderr)
+    conditional = None
+    if args.condition:
+        conditional = (structure.treeFormats.savedConditions().
+                       get(args.condition))
+        if not conditional:
+            return _error(exitUsageError, 'no saved condition named "{0}"'.
+                          format(args.condition))
+        dialog.exportWhat = (dialog.selectNode if args.nodes_only else
+                             dialog.selectBranch)
+    else:
+        dialog.exportWhat = dialog.entireTree
+    if ((dialog.exportWhat == dialog.entireTree and
+         subtype in dialog.disableEntireTree) or
+        (dialog.exportWhat == dialog.selectBranch and
+         subtype in dialog.disableSelBranches) or
+        (dialog.exportWhat == dialog.selectNode and
+         subtype in dialog.disableSelNodes)):
+        return _error(exitUsageError, 'export type "{0}" is not available '
+                      'for the {1}'.format(subtype, ('entire tree',
+                                                     'condition branches',
+                                                     'condition nodes')
+                                           [dialog.exportWhat]))
+    if subtype in _liveTypes:
+        prefPath = (exports.templatePath + '/exports' if exports.templatePath
+                    else '')
+        for fileName in _liveTemplateNames:
+            if not control.findResourceFile(fileName, 'templates/exports',
+                                            prefPath):
+                return _error(exitReadError, 'export template file {0} not '
+                              'found'.format(fileName))
+    selection = ConditionSelection(structure, conditional)
+    if conditional and not selection.spots:
+        return _error(exitUsageError, 'no nodes match condition "{0}"'.
+                      format(args.condition))
+    # match the export dialog's settings for disabled controls
+    if (subtype in dialog.enableRootNode and
+        dialog.exportWhat != dialog.selectNode):
+        dialog.includeRoot = args.include_root
+    else:
+        dialog.includeRoot = subtype not in dialog.forceRootNodeOff
+    dialog.openOnly = False
+    dialog.addHeader = args.header and subtype in dialog.enableHeader
+    dialog.numColumns = (args.columns if subtype in dialog.enableColumns
+                         else 1)
+    dialog.navPaneLevels = args.nav_levels
+    dialog.currentSubtype = subtype
+    outputPathObj = args.output
+    exportControl = exports.ExportControl(structure, selection,
+                                          outputPathObj, control.printData)
+    try:
+        if subtype in _directoryTypes:
+            outputPathObj.mkdir(parents=True, exist_ok=True)
+        result = exportControl.exportMethods()[subtype](outputPathObj)
+    except OSError as err:
+        return _error(exitWriteError, 'could not write {0}: {1}'.
+                      format(outputPathObj, err))
+    finally:
+        QApplication.restoreOverrideCursor()
+    if not result:
+        return _error(exitWriteError, 'export to {0} failed'.
+                      format(outputPathObj))
+    return exitOK
+
+def _error(exitCode, message):
+    """Print an error message to stderr and return the exit code.
+
+    Arguments:
+        exitCode -- the exit code to return
+        message -- the error text
+    """
+    print('TreeLine: error - {0}'.format(message), file=sys.stderr)
+    return exitCode
@@ -23,7 +23,7 @@ import csv
 import shutil
 from xml.etree import ElementTree
 from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QFontInfo
+from PyQt6.QtGui import QFontInfo, QTextDocument
 from PyQt6.QtWidgets import (QApplication, QButtonGroup, QCheckBox, QDialog,
                              QFileDialog, QGroupBox, QHBoxLayout, QLabel,
                              QMessageBox, QRadioButton, QSpinBox, QVBoxLayout,
@@ -85,31 +85,35 @@ class ExportControl:
 
         Return True if export is successful.
         """
-        exportMethods = {'htmlSingle': self.exportHtmlSingle,
-                         'htmlNavSingle': self.exportHtmlNavSingle,
-                         'htmlPages': self.exportHtmlPages,
-                         'htmlTables': self.exportHtmlTables,
-                         'htmlLiveLink': self.exportHtmlLiveLink,
-                         'htmlLiveSingle': self.exportHtmlLiveSingle,
-                         'textTitles': self.exportTextTitles,
-                         'textPlain': self.exportTextPlain,
-                         'textTableMultiCsv': self.exportTextTableMultiCsv,
-                         'textTableCsv': self.exportTextTableCsv,
-                         'textTableTab': self.exportTextTableTab,
-                         'oldTreeLine': self.exportOldTreeLine,
-                         'treeLineSubtree': self.exportSubtree,
-                         'xmlGeneric': self.exportXmlGeneric,
-                         'odfText': self.exportOdfText,
-                         'bookmarksHtml': self.exportBookmarksHtml,
-                         'bookmarksXbel': self.exportBookmarksXbel}
         exportDialog = ExportDialog(len(self.selectedNodes),
                                     QApplication.activeWindow())
         if exportDialog.exec() == QDialog.DialogCode.Accepted:
-            result = exportMethods[ExportDialog.currentSubtype]()
+            result = self.exportMethods()[ExportDialog.currentSubtype]()
             QApplication.restoreOverrideCursor()
             return result
         return False
 
+    def exportMethods(self):
+        """Return a dict of export subtype names and their export methods.
+        """
+        return {'htmlSingle': self.exportHtmlSingle,
+                'htmlNavSingle': self.exportHtmlNavSingle,
+                'htmlPages': self.exportHtmlPages,
+                'htmlTables': self.exportHtmlTables,
+                'htmlLiveLink': self.exportHtmlLiveLink,
+                'htmlLiveSingle': self.exportHtmlLiveSingle,
+                'textTitles': self.exportTextTitles,
+                'textPlain': self.exportTextPlain,
+                'textTableMultiCsv': self.exportTextTableMultiCsv,
+                'textTableCsv': self.exportTextTableCsv,
+                'textTableTab': self.exportTextTableTab,
+                'oldTreeLine': self.exportOldTreeLine,
+                'treeLineSubtree': self.exportSubtree,
+                'xmlGeneric': self.exportXmlGeneric,
+                'odfText': self.exportOdfText,
+                'bookmarksHtml': self.exportBookmarksHtml,
+                'bookmarksXbel': self.exportBookmarksXbel}
+
     def getFileName(self, dialogTitle, defaultExt='txt'):
         """Prompt the user for a filename and return a path object.
 
@@ -237,7 +241,7 @@ class ExportControl:
                  '--></style>',
                  '</head>', '<body>', '<div id="sidebar">']
         prevLevel = 0
-        treeView = globalref.mainControl.activeControl.activeWindow.treeView
+        treeView = _openOnlyTreeView()
         for parentSpot in self.selectedSpots:
             for spot, level in parentSpot.levelSpotDescendantGen(treeView,
                                                                  ExportDialog.
@@ -539,8 +543,7 @@ class ExportControl:
         if ExportDialog.exportWhat == ExportDialog.selectNode:
             lines = [spot.nodeRef.title(spot) for spot in self.selectedSpots]
         else:
-            treeView = (globalref.mainControl.activeControl.activeWindow.
-                        treeView)
+            treeView = _openOnlyTreeView()
             lines = []
             for rootSpot in self.selectedSpots:
                 for spot, level in rootSpot.levelSpotDescendantGen(treeView,
@@ -578,8 +581,7 @@ class ExportControl:
                 if rootSpot.nodeRef.formatRef.spaceBetween:
                     lines.append('')
         else:
-            treeView = (globalref.mainControl.activeControl.activeWindow.
-                        treeView)
+            treeView = _openOnlyTreeView()
             for rootSpot in self.selectedSpots:
                 for spot, level in rootSpot.levelSpotDescendantGen(treeView,
                                                   ExportDialog.includeRoot,
@@ -611,7 +613,7 @@ class ExportControl:
         QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
         if ExportDialog.exportWhat == ExportDialog.entireTree:
             self.selectedSpots = self.structure.rootSpots()
-        treeView = (globalref.mainControl.activeControl.activeWindow.treeView)
+        treeView = _openOnlyTreeView()
         types = set()
         headings = []
         for rootSpot in self.selectedSpots:
@@ -857,9 +859,7 @@ class ExportControl:
             ElementTree.register_namespace(prefix, uri)
 
         versionAttr = {'office:version': '1.0'}
-        fontInfo = QFontInfo(globalref.mainControl.activeControl.
-                                   activeWindow.editorSplitter.widget(0).
-                                   font())
+        fontInfo = QFontInfo(_editorFont())
         fontAttr = {'style:font-pitch':
                     'fixed' if fontInfo.fixedPitch() else 'variable',
                     'style:name': fontInfo.family(),
@@ -1506,6 +1506,26 @@ def _addElemToZip(destZip, rootElem, fileName):
         elemTree.write(output, 'utf-8', True)
         destZip.writestr(fileName, output.getvalue())
 
+def _openOnlyTreeView():
+    """Return the active tree view if only open nodes are exported.
+
+    Returns None otherwise, so exports of whole branches need no window.
+    """
+    if ExportDialog.openOnly:
+        return globalref.mainControl.activeControl.activeWindow.treeView
+    return None
+
+def _editorFont():
+    """Return the data editor font from the options.
+
+    Matches the font set in the editor views, without needing a window.
+    """
+    font = QTextDocument().defaultFont()
+    fontName = globalref.miscOptions['EditorFont']
+    if fontName:
+        font.fromString(fontName)
+    return font
+
 def _addOdfElement(name, parent=None, attr=None):
     """Shortcut function to add elements to the ElementTree.
 
@@ -16,6 +16,7 @@ import re
 import sys
 import enum
 import datetime
+import functools
 import xml.sax.saxutils as saxutils
 import gennumber
 import genboolean
@@ -38,6 +39,8 @@ MathResult = enum.Enum('MathResult', 'number date time boolean text')
 _mathResultBlank = {MathResult.number: 0, MathResult.date: 0,
                     MathResult.time: 0, MathResult.boolean: False,
                     MathResult.text: ''}
+_maxCompareValueCache = 100
+_parsedValueCacheSize = 4096
 _multipleSpaceRegEx = re.compile(r' {2,}')
 _lineBreakRegEx = re.compile(r'<br\s*/?>', re.I)
 _stripTagRe = re.compile(r'<.*?>')
@@ -83,6 +86,7 @@ class TextField:
             self.evalHtml = formatData.get('evalhtml', self.evalHtmlDefault)
         self.useFileInfo = False
         self.showInDialog = True
+        self.compareValueCache = {}  # (value, edit formats): adjusted value
         self.setFormat(formatData.get('format', type(self).defaultFormat))
 
     def formatData(self):
@@ -198,6 +202,30 @@ class TextField:
         """
         return self.storedText(saxutils.escape(titleText))
 
+    def storedCompareValue(self, value):
+        """Return stored text for a conditional's comparison value.
+
+        Returns the value unchanged if it does not match the format.
+        Results are cached by the edit format options, since a conditional
+        adjusts the same value for every node that it checks.
+        Arguments:
+            value -- the comparison value to convert
+        """
+        key = (value, globalref.genOptions['EditDateFormat'],
+               globalref.genOptions['EditTimeFormat'])
+        try:
+            return self.compareValueCache[key]
+        except KeyError:
+            pass
+        try:
+            storedText = self.storedText(value)
+        except ValueError:
+            storedText = value
+        if len(self.compareValueCache) >= _maxCompareValueCache:
+            self.compareValueCache.clear()
+        self.compareValueCache[key] = storedText
+        return storedText
+
     def getInitDefault(self):
         """Return the initial stored value for newly created nodes.
         """
@@ -657,23 +685,49 @@ class MathField(HtmlTextField):
                                                   zeroValue, not self.evalHtml)
             except ValueError:
                 return _errorStr
-            if num == None:
-                return ''
-            if self.resultType == MathResult.date:
-                date = DateField.refDate + datetime.timedelta(days=num)
-                return date.strftime(DateField.isoFormat)
-            if self.resultType == MathResult.time:
-                dateTime = datetime.datetime.combine(DateField.refDate,
-                                                     TimeField.refTime)
-                dateTime = dateTime + datetime.timedelta(seconds=num)
-                time = dateTime.time()
-                return time.strftime(TimeField.isoFormat)
-            text = str(num)
-            if not self.evalHtml:
-                text = saxutils.escape(text)
-            return text
+            return self.resultText(num)
         return ''
 
+    def equationValues(self, nodes, zeroBlanks=True):
+        """Return a list of text values from the equation for several nodes.
+
+        The nodes must all use this field's node type.
+        Arguments:
+            nodes -- a list of tree items with this equation
+            zeroBlanks -- replace blank fields with zeros if True
+        """
+        if not self.equation:
+            return [''] * len(nodes)
+        zeroValue = _mathResultBlank[self.resultType]
+        return [self.resultText(num) for num in
+                self.equation.equationValues(nodes, self.resultType,
+                                             zeroBlanks, zeroValue,
+                                             not self.evalHtml)]
+
+    def resultText(self, num):
+        """Return the stored text for an equation result.
+
+        Arguments:
+            num -- the result value, None if blank or a ValueError if illegal
+        """
+        if isinstance(num, ValueError):
+            return _errorStr
+        if num == None:
+            return ''
+        if self.resultType == MathResult.date:
+            date = DateField.refDate + datetime.timedelta(days=num)
+            return date.strftime(DateField.isoFormat)
+        if self.resultType == MathResult.time:
+            dateTime = datetime.datetime.combine(DateField.refDate,
+                                                 TimeField.refTime)
+            dateTime = dateTime + datetime.timedelta(seconds=num)
+            time = dateTime.time()
+            return time.strftime(TimeField.isoFormat)
+        text = str(num)
+        if not self.evalHtml:
+            text = saxutils.escape(text)
+        return text
+
     def resultClass(self):
         """Return the result type's field class.
         """
@@ -704,9 +758,7 @@ class MathField(HtmlTextField):
             if self.resultType == MathResult.number:
                 return gennumber.GenNumber(storedText).num
             if self.resultType == MathResult.date:
-                date = datetime.datetime.strptime(storedText,
-                                                  DateField.isoFormat).date()
-                return (date - DateField.refDate).days
+                return _dateValue(storedText)
             if self.resultType == MathResult.time:
                 time = datetime.datetime.strptime(storedText,
                                                   TimeField.isoFormat).time()
@@ -989,9 +1041,7 @@ class DateField(HtmlTextField):
         """
         storedText = node.data.get(self.name, '')
         if storedText:
-            date = datetime.datetime.strptime(storedText,
-                                              DateField.isoFormat).date()
-            return (date - DateField.refDate).days
+            return _dateValue(storedText)
         return 0 if zeroBlanks else None
 
     def compareValue(self, node):
@@ -1017,10 +1067,7 @@ class DateField(HtmlTextField):
         if value == _dateStampString:
             date = datetime.date.today()
             return date.strftime(DateField.isoFormat)
-        try:
-            return self.storedText(value)
-        except ValueError:
-            return value
+        return self.storedCompareValue(value)
 
 
 class TimeField(HtmlTextField):
@@ -1185,12 +1232,7 @@ class TimeField(HtmlTextField):
         """
         storedText = node.data.get(self.name, '')
         if storedText:
-            time = datetime.datetime.strptime(storedText,
-                                              TimeField.isoFormat).time()
-            dateTime = datetime.datetime.combine(DateField.refDate, time)
-            refDateTime = datetime.datetime.combine(DateField.refDate,
-                                                    TimeField.refTime)
-            return (dateTime - refDateTime).seconds
+            return _timeValue(storedText)
         return 0 if zeroBlanks else None
 
     def compareValue(self, node):
@@ -1216,10 +1258,7 @@ class TimeField(HtmlTextField):
         if value == _timeStampString:
             time = datetime.datetime.now().time()
             return time.strftime(TimeField.isoFormat)
-        try:
-            return self.storedText(value)
-        except ValueError:
-            return value
+        return self.storedCompareValue(value)
 
 
 class DateTimeField(HtmlTextField):
@@ -1387,9 +1426,7 @@ class DateTimeField(HtmlTextField):
         """
         storedText = node.data.get(self.name, '')
         if storedText:
-            dateTime = datetime.datetime.strptime(storedText,
-                                                  DateTimeField.isoFormat)
-            return (dateTime - DateTimeField.refDateTime).total_seconds()
+            return _dateTimeValue(storedText)
         return 0 if zeroBlanks else None
 
     def compareValue(self, node):
@@ -1415,10 +1452,7 @@ class DateTimeField(HtmlTextField):
         if value == _timeStampString:
             dateTime = datetime.datetime.now()
             return dateTime.strftime(DateTimeField.isoFormat)
-        try:
-            return self.storedText(value)
-        except ValueError:
-            return value
+        return self.storedCompareValue(value)
 
 
 class ChoiceField(HtmlTextField):
@@ -2545,6 +2579,43 @@ def adjTimeAmPm(timeFormat, time):
         timeFormat = re.sub(r'(?<!%)%p', amPm, timeFormat)
     return timeFormat
 
+@functools.lru_cache(maxsize=_parsedValueCacheSize)
+def _dateValue(storedText):
+    """Return the number of days from the reference date for stored text.
+
+    Results are cached by text, since a file usually repeats few dates.
+    Raises a ValueError if it isn't a valid date (not cached).
+    Arguments:
+        storedText -- the stored ISO date text to parse
+    """
+    date = datetime.datetime.strptime(storedText, DateField.isoFormat).date()
+    return (date - DateField.refDate).days
+
+@functools.lru_cache(maxsize=_parsedValueCacheSize)
+def _timeValue(storedText):
+    """Return the number of seconds from the reference time for stored text.
+
+    Raises a ValueError if it isn't a valid time.
+    Arguments:
+        storedText -- the stored ISO time text to parse
+    """
+    time = datetime.datetime.strptime(storedText, TimeField.isoFormat).time()
+    dateTime = datetime.datetime.combine(DateField.refDate, time)
+    refDateTime = datetime.datetime.combine(DateField.refDate,
+                                            TimeField.refTime)
+    return (dateTime - refDateTime).seconds
+
+@functools.lru_cache(maxsize=_parsedValueCacheSize)
+def _dateTimeValue(storedText):
+    """Return the number of seconds from the reference date and time.
+
+    Raises a ValueError if it isn't a valid date and time.
+    Arguments:
+        storedText -- the stored ISO date and time text to parse
+    """
+    dateTime = datetime.datetime.strptime(storedText, DateTimeField.isoFormat)
+    return (dateTime - DateTimeField.refDateTime).total_seconds()
+
 def translatedTypeName(typeName):
     """Return a translated type name.
 
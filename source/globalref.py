@@ -26,14 +26,18 @@ treeIcons = None
 localTextEncoding = ''
 lang = ''
 
-fileFilters = {'trlnopen': '{} (*.trln *.trln.gz *.trl)'.
+fileFilters = {'trlnopen': '{} (*.trln *.trln.gz *.trlndb *.trl)'.
                            format(_('All TreeLine Files')),
-               'trlnv3': '{} (*.trln *.trln.gz)'.format(_('TreeLine Files')),
+               'trlnv3': '{} (*.trln *.trln.gz *.trlndb)'.
+                         format(_('TreeLine Files')),
                'trlnsave': '{} (*.trln)'.format(_('TreeLine Files')),
                'trlngz': '{} (*.trln *.trln.gz)'.
                          format(_('TreeLine Files - Compressed')),
                'trlnenc': '{} (*.trln)'.
                           format(_('TreeLine Files - Encrypted')),
+               'trlndb': '{} (*.trlndb)'.
+                         format(_('TreeLine Files - Database, '
+                                  'Incremental Saves')),
                'trl': '{} (*.trl *.xml)'.format(_('Old TreeLine Files')),
                'all': '{} (*)'.format(_('All Files')),
                'html': '{} (*.html *.htm)'.format(_('HTML Files')),
@@ -674,17 +674,15 @@ class ImportControl:
                 node =  treenode.TreeNode(tpFormat)
                 node.data[nodeformat.defaultFieldName] = title
                 node.data[textFieldName] = '\n'.join(lines)
-                node.level = level
-                nodeList.append(node)
+                nodeList.append((node, level))
                 structure.addNodeDictRef(node)
         parentList = []
-        for node in nodeList:
-            if node.level != 0:
-                parentList = parentList[:node.level]
-                node.parent = parentList[-1]
+        for node, level in nodeList:
+            if level != 0:
+                parentList = parentList[:level]
                 parentList[-1].childList.append(node)
             parentList.append(node)
-        structure.childList = [nodeList[0]]
+        structure.childList = [nodeList[0][0]]
         structure.generateSpots(None)
         return structure
 
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+
+#******************************************************************************
+# jsonstream.py, provides a class to read TreeLine JSON files incrementally
+#
+# TreeLine, an information storage program
+# Copyright (C) 2025, Douglas W. Bell
+#
+# This is free software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License, either Version 2 or any later
+# version.  This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY.  See the included LICENSE file for details.
+#******************************************************************************
+
+import json
+
+_readSize = 1048576
+_whitespace = ' \t\n\r'
+_decoder = json.JSONDecoder()
+
+
+class JsonStreamData:
+    """Class to read the sections of a TreeLine JSON file as needed.
+
+    Used in place of the fileData dict from json.load.  The node records are
+    returned by a generator that decodes them one at a time from the file, so
+    the full list of raw records is never held in memory.  Other sections are
+    decoded whole.  Raises ValueError for files that are not valid JSON.
+    """
+    def __init__(self, fileObj, progressFunc=None):
+        """Initialize the stream reader.
+
+        Arguments:
+            fileObj -- a text file object positioned at the start
+            progressFunc -- optional, called with the characters read so far
+        """
+        self.fileObj = fileObj
+        self.progressFunc = progressFunc
+        self.buffer = ''
+        self.pos = 0
+        self.charsRead = 0
+        self.atEnd = False
+        self.sections = {}
+        self.nodeGen = None
+        self.objectDone = False
+        self.skipSpace()
+        if not self.nextChar('{'):
+            raise ValueError('file does not contain a JSON object')
+
+    def __getitem__(self, key):
+        """Return a section, reading ahead in the file if necessary.
+
+        Returns a node record generator for the nodes section if it was not
+        read yet.  Raises KeyError if the section is not in the file.
+        Arguments:
+            key -- the section name
+        """
+        if key in self.sections:
+            return self.sections[key]
+        self.finishNodes()
+        while not self.objectDone:
+            name = self.readSectionName()
+            if name is None:
+                break
+            if name == 'nodes' and key == 'nodes':
+                self.nodeGen = self.nodeRecordGen()
+                self.sections[name] = self.nodeGen
+                return self.nodeGen
+            self.sections[name] = self.readValue()
+            if name == key:
+                return self.sections[name]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        """Return True if the section is in the file.
+
+        Arguments:
+            key -- the section name
+        """
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, key, default=None):
+        """Return a section or the default if the section is not in the file.
+
+        Arguments:
+            key -- the section name
+            default -- the value to return if not found
+        """
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def nodeRecordGen(self):
+        """Return a generator that decodes node records from the nodes list.
+        """
+        self.skipSpace()
+        if not self.nextChar('['):
+            raise ValueError('nodes section is not a list')
+        self.skipSpace()
+        if not self.nextChar(']'):
+            while True:
+                yield self.readValue()
+                self.skipSpace()
+                if self.nextChar(']'):
+                    break
+                if not self.nextChar(','):
+                    raise ValueError('missing separator in nodes list')
+        self.nodeGen = None
+
+    def finishNodes(self):
+        """Store the remaining node records if another section is requested.
+        """
+        if self.nodeGen:
+            self.sections['nodes'] = list(self.nodeGen)
+            self.nodeGen = None
+
+    def readSectionName(self):
+        """Read the next section name and its separator.
+
+        Return None at the end of the object.
+        """
+        self.skipSpace()
+        if self.nextChar('}'):
+            self.objectDone = True
+            return None
+        if self.sections and not self.nextChar(','):
+            raise ValueError('missing separator between sections')
+        name = self.readValue()
+        self.skipSpace()
+        if not isinstance(name, str) or not self.nextChar(':'):
+            raise ValueError('bad section name')
+        return name
+
+    def readValue(self):
+        """Decode and return the next JSON value in the file.
+        """
+        self.skipSpace()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.atEnd:
+                    raise
+                self.readMore()
+                continue
+            # a value that ends the buffer (like a number) may be incomplete
+            if end < len(self.buffer) or self.atEnd:
+                self.pos = end
+                return value
+            self.readMore()
+
+    def skipSpace(self):
+        """Move the position past any whitespace.
+        """
+        while True:
+            while (self.pos < len(self.buffer) and
+                   self.buffer[self.pos] in _whitespace):
+                self.pos += 1
+            if self.pos < len(self.buffer) or self.atEnd:
+                return
+            self.readMore()
+
+    def nextChar(self, char):
+        """Move past the given character and return True if it is next.
+
+        Arguments:
+            char -- the structural character to check for
+        """
+        if self.buffer.startswith(char, self.pos):
+            self.pos += 1
+            return True
+        return False
+
+    def readMore(self):
+        """Add another block of text from the file to the buffer.
+
+        Drops the text before the current position.
+        """
+        text = self.fileObj.read(_readSize)
+        if not text:
+            self.atEnd = True
+        self.buffer = self.buffer[self.pos:] + text
+        self.pos = 0
+        self.charsRead += len(text)
+        if self.progressFunc and text:
+            self.progressFunc(self.charsRead)
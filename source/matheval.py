@@ -17,9 +17,15 @@ import ast
 import enum
 import datetime
 import builtins
+import fractions
+import functools
 import fieldformat
 import gennumber
 from math import *
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 _nowDateString = 'Now_Date'
 _nowTimeString = 'Now_Time'
@@ -32,13 +38,15 @@ def sum(*args):
     Arguments:
         *args -- lists of numbers or individual numbers
     """
+    if len(args) == 1 and isinstance(args[0], ChildAggregate):
+        return args[0].sum()
     fullList = []
     for arg in args:
         if hasattr(arg, 'extend'):
             fullList.extend(arg)
         else:
             fullList.append(arg)
-    return builtins.sum(fullList)
+    return _exactSum(fullList)
 
 def max(*args):
     """Override the builtin max function to expand list arguments.
@@ -46,6 +54,8 @@ def max(*args):
     Arguments:
         *args -- lists of numbers or individual numbers
     """
+    if len(args) == 1 and isinstance(args[0], ChildAggregate):
+        return args[0].max()
     fullList = []
     for arg in args:
         if hasattr(arg, 'extend'):
@@ -62,6 +72,8 @@ def min(*args):
     Arguments:
         *args -- lists of numbers or individual numbers
     """
+    if len(args) == 1 and isinstance(args[0], ChildAggregate):
+        return args[0].min()
     fullList = []
     for arg in args:
         if hasattr(arg, 'extend'):
@@ -78,6 +90,8 @@ def mean(*args):
     Arguments:
         *args -- lists of numbers or individual numbers
     """
+    if len(args) == 1 and isinstance(args[0], ChildAggregate):
+        return args[0].mean()
     fullList = []
     for arg in args:
         if hasattr(arg, 'extend'):
@@ -86,7 +100,34 @@ def mean(*args):
             fullList.append(arg)
     if not fullList:
         return 0
-    return builtins.sum(fullList) / len(fullList)
+    return _exactSum(fullList) / len(fullList)
+
+def _exactSum(values):
+    """Return the sum of numbers, correctly rounded if there are floats.
+
+    Matches the ChildAggregate sums, so a total doesn't depend on the number
+    or the order of the children.  Integers are split into exact float parts
+    for fsum.  Falls back to the builtin sum for other values and overflows.
+    Arguments:
+        values -- a list of numbers
+    """
+    if not any(isinstance(value, float) for value in values):
+        return builtins.sum(values)
+    parts = []
+    try:
+        for value in values:
+            if isinstance(value, float):
+                parts.append(value)
+            elif isinstance(value, int):
+                while value:
+                    part = float(value)
+                    parts.append(part)
+                    value -= int(part)
+            else:
+                return builtins.sum(values)
+        return fsum(parts)
+    except (ValueError, OverflowError):
+        return builtins.sum(values)
 
 # don't use pow() function from math library
 pow = builtins.pow
@@ -169,6 +210,14 @@ def count(text):
 
 
 _fieldSplitRe = re.compile(r'{\*(\*|\$|&|#|\b)([\w_\-.]+)\*}')
+_inputNamePrefix = '_eqnInput'
+_textValueCacheSize = 4096
+_aggregateFunctions = {'sum', 'mean', 'max', 'min'}
+# equations with only these syntax parts can be evaluated over NumPy arrays
+_vectorNodeTypes = {'BinOp', 'UnaryOp', 'Name', 'Constant', 'Load', 'Add',
+                    'Sub', 'Mult', 'Div', 'USub', 'UAdd'}
+# parents with fewer children are scanned instead of using a ChildAggregate
+minAggregateChildren = 50
 
 class MathEquation:
     """Class to parse, check, store and evaluate a Math field equation.
@@ -181,6 +230,8 @@ class MathEquation:
         """
         self.fieldRefs = []
         self.formattedEqnText = ''
+        self.compiledFunc = None
+        self.vectorCompatible = False
         self.parseEquation(eqnText)
 
     def equationText(self):
@@ -233,23 +284,107 @@ class MathEquation:
             noMarkup -- if true, remove html markup
         """
         zeroBlanks = eqnNode.treeStructureRef().mathZeroBlanks
-        checker = SafeEvalChecker()
+        numResult = resultType == fieldformat.MathResult.number
         inputs = []
         for ref in self.fieldRefs:
             inp = ref.referenceValue(eqnNode, zeroBlanks, zeroValue, noMarkup)
             if inp == None and not zeroBlanks:
                 return None
-            if (resultType == fieldformat.MathResult.number and
-                hasattr(inp, 'format')):
-                try:
-                    checker.check(inp)
-                    inp = eval(inp)
-                except Exception:
-                    inp = repr(inp)
-            else:
-                inp = repr(inp)
+            if numResult and hasattr(inp, 'format'):
+                inp = _textNumValue(inp)
             inputs.append(inp)
-        eqn = self.formattedEqnText.format(*inputs)
+        if not self.compiledFunc:
+            return self.textEquationValue(inputs)
+        try:
+            return self.compiledFunc(*inputs)
+        except Exception as err:
+            raise ValueError(err)
+
+    def equationValues(self, eqnNodes, resultType, zeroBlanks=True,
+                       zeroValue=0, noMarkup=True):
+        """Return a list of values for the equation in several nodes.
+
+        Gathers a column of values for each reference, then evaluates the
+        equation over the columns.  NumPy arrays are used if it is installed
+        and the equation and all inputs are plain float arithmetic.  Results
+        are None if references are invalid and a ValueError object for
+        illegal math operations.
+        Arguments:
+            eqnNodes -- a list of nodes of one type containing the equation
+            resultType -- the result type from fieldformat
+            zeroBlanks -- replace blank fields with zeroValue if True
+            zeroValue -- the value to use for blanks
+            noMarkup -- if true, remove html markup
+        """
+        numResult = resultType == fieldformat.MathResult.number
+        columns = []
+        for ref in self.fieldRefs:
+            column = ref.referenceValues(eqnNodes, zeroBlanks, zeroValue,
+                                         noMarkup)
+            if numResult:
+                column = [_textNumValue(inp) if hasattr(inp, 'format') else
+                          inp for inp in column]
+            columns.append(column)
+        if numpy and self.vectorCompatible and columns:
+            results = self.vectorValues(columns)
+            if results:
+                return results
+        results = [None] * len(eqnNodes)
+        for i in range(len(eqnNodes)):
+            inputs = [column[i] for column in columns]
+            for inp in inputs:
+                if isinstance(inp, ValueError):
+                    results[i] = inp
+                    break
+                if inp == None and not zeroBlanks:
+                    results[i] = None
+                    break
+            else:
+                if not self.compiledFunc:
+                    try:
+                        results[i] = self.textEquationValue(inputs)
+                    except ValueError as err:
+                        results[i] = err
+                    continue
+                try:
+                    results[i] = self.compiledFunc(*inputs)
+                except Exception as err:
+                    results[i] = ValueError(err)
+        return results
+
+    def vectorValues(self, columns):
+        """Return a list of equation results from NumPy arrays of the inputs.
+
+        Return None if any input is not a float, since other types may not
+        give the same results as Python arithmetic, or if any row has a
+        floating point error, so that Python can give the exact results.
+        Arguments:
+            columns -- a list of input value lists, one for each reference
+        """
+        for column in columns:
+            for inp in column:
+                if type(inp) is not float:
+                    return None
+        arrays = [numpy.array(column, dtype=float) for column in columns]
+        try:
+            with numpy.errstate(divide='raise', over='raise',
+                                invalid='raise', under='ignore'):
+                results = self.compiledFunc(*arrays)
+        except Exception:
+            return None
+        if not isinstance(results, numpy.ndarray):
+            return None
+        return results.tolist()
+
+    def textEquationValue(self, inputs):
+        """Return the equation value by evaluating text with the inputs.
+
+        Used for equations that could not be compiled with input parameters.
+        Raise a ValueError for illegal math operations.
+        Arguments:
+            inputs -- a list of the reference values
+        """
+        eqn = self.formattedEqnText.format(*[repr(inp) for inp in inputs])
         try:
             return eval(eqn)
         except Exception as err:
@@ -264,6 +399,52 @@ class MathEquation:
         """
         self.fieldRefs = []
         self.formattedEqnText = _fieldSplitRe.sub(self._replFunc, eqnText)
+        self.compileEquation()
+
+    def compileEquation(self):
+        """Compile the equation into a function with a parameter per input.
+
+        The function is checked with the same rules as the equation text.
+        Leaves compiledFunc as None if the references are not used as
+        plain values (such as within a string), so the equation text is
+        evaluated instead.
+        """
+        self.compiledFunc = None
+        self.vectorCompatible = False
+        for ref in self.fieldRefs:
+            ref.aggregateCall = False
+        if _inputNamePrefix in self.formattedEqnText:
+            return
+        names = ['{0}{1}'.format(_inputNamePrefix, i) for i in
+                 range(len(self.fieldRefs))]
+        try:
+            expr = self.formattedEqnText.format(*names)
+            SafeEvalChecker().check(expr)
+            tree = ast.parse(expr, mode='eval')
+        except (IndexError, KeyError, ValueError, SyntaxError):
+            return
+        usedNames = [node.id for node in ast.walk(tree) if
+                     isinstance(node, ast.Name)]
+        if not set(usedNames).issuperset(names):
+            return
+        funcText = 'lambda {0}: (\n{1}\n)'.format(', '.join(names), expr)
+        try:
+            self.compiledFunc = eval(compile(funcText, '<equation>', 'eval'))
+        except SyntaxError:
+            return
+        # child refs used only as the single argument of an aggregate
+        # function can be given a ChildAggregate in place of a list
+        aggregateNames = [node.args[0].id for node in ast.walk(tree) if
+                          isinstance(node, ast.Call) and
+                          isinstance(node.func, ast.Name) and
+                          node.func.id in _aggregateFunctions and
+                          len(node.args) == 1 and not node.keywords and
+                          isinstance(node.args[0], ast.Name)]
+        for name, ref in zip(names, self.fieldRefs):
+            if ref.tagPrefix == '&':
+                ref.aggregateCall = (aggregateNames.count(name) ==
+                                     usedNames.count(name))
+        self.vectorCompatible = _vectorCompatible(tree, names)
 
     def _replFunc(self, matchObj):
         """Adds a field ref for each field match from the parser.
@@ -282,6 +463,80 @@ class MathEquation:
         return '{}'
 
 
+@functools.lru_cache(maxsize=_textValueCacheSize)
+def _textNumValue(text):
+    """Return the evaluated value of a text input to a numeric equation.
+
+    Returns the text unchanged if it is not a legal expression.
+    Results are cached since the same text is often found in many nodes.
+    Arguments:
+        text -- the text field value
+    """
+    try:
+        SafeEvalChecker().check(text)
+        return eval(text)
+    except Exception:
+        return text
+
+def _parentEqnNodes(refNode, eqnNodeTypeName):
+    """Return a list of the parents of a node that have the given type.
+
+    Includes the parents of all clone spots.
+    Arguments:
+        refNode -- the child node
+        eqnNodeTypeName -- the type name of the equation nodes
+    """
+    nodes = []
+    for spot in refNode.spotRefs:
+        node = spot.parentSpot.nodeRef if spot.parentSpot else None
+        if (node and node.formatRef and
+            node.formatRef.name == eqnNodeTypeName and node not in nodes):
+            nodes.append(node)
+    return nodes
+
+def _vectorCompatible(tree, names):
+    """Return True if a parsed equation can be evaluated over NumPy arrays.
+
+    Only allows float arithmetic with an optional comparison at the top, so
+    there are no boolean or integer intermediate values.
+    Arguments:
+        tree -- the ast expression tree of the equation
+        names -- a list of the input parameter names
+    """
+    parts = [tree.body]
+    if isinstance(tree.body, ast.Compare) and len(tree.body.ops) == 1:
+        parts = [tree.body.left] + tree.body.comparators
+    for part in parts:
+        for node in ast.walk(part):
+            if type(node).__name__ not in _vectorNodeTypes:
+                return False
+            if isinstance(node, ast.Name) and node.id not in names:
+                return False
+            if (isinstance(node, ast.Constant) and
+                type(node.value) not in (int, float)):
+                return False
+    return True
+
+def batchEvaluable(eqnRefDict):
+    """Return True if a math level can be evaluated in batches by node type.
+
+    True if no equation in the level references a field of another node
+    that is also calculated in this level, so the order of the nodes
+    doesn't change the results.
+    Arguments:
+        eqnRefDict -- a dict of RecursiveEqnRef lists by type name
+    """
+    levelFields = {eqnRef.eqnField.name for eqnRefs in eqnRefDict.values()
+                   for eqnRef in eqnRefs}
+    for eqnRefs in eqnRefDict.values():
+        for eqnRef in eqnRefs:
+            for fieldRef in eqnRef.eqnField.equation.fieldRefs:
+                if (fieldRef.tagPrefix in ('*', '$', '&') and
+                    fieldRef.fieldName in levelFields):
+                    return False
+    return True
+
+
 # recursive equation ref eval directions
 EvalDir = enum.IntEnum('EvalDir', 'downward upward optional')
 
@@ -293,6 +548,7 @@ class EquationFieldRef:
     """
     tagPrefix = ''
     testValue = 1
+    aggregateCall = False
     evalDirection = EvalDir.optional
     def __init__(self, fieldName):
         """Initialize the field references.
@@ -334,6 +590,26 @@ class EquationFieldRef:
                         fieldformat.DateTimeField.refDateTime).total_seconds()
             return zeroValue if zeroBlanks else None
 
+    def referenceValues(self, eqnNodes, zeroBlanks=True, zeroValue=0,
+                        noMarkup=True):
+        """Return a list of the referenced values for several nodes.
+
+        Invalid values are returned as ValueError objects instead of raised.
+        Arguments:
+            eqnNodes -- a list of nodes containing the equation
+            zeroBlanks -- replace blank fields with zeroValue if True
+            zeroValue -- the value to use for blanks
+            noMarkup -- if true, remove html markup
+        """
+        values = []
+        for node in eqnNodes:
+            try:
+                values.append(self.referenceValue(node, zeroBlanks, zeroValue,
+                                                  noMarkup))
+            except ValueError as err:
+                values.append(err)
+        return values
+
     def dependentEqnNodes(self, refNode):
         """Return a list of equation node(s) that reference the given node.
 
@@ -443,6 +719,13 @@ class EquationChildRef(EquationFieldRef):
             zeroBlanks -- replace blank fields with zeroValue if True
             zeroValue -- the value to use for blanks
         """
+        if len(eqnNode.childList) >= minAggregateChildren:
+            aggregate = (eqnNode.treeStructureRef().
+                         childAggregate(eqnNode, self.fieldName, zeroBlanks,
+                                        noMarkup))
+            if self.aggregateCall and aggregate.isNumeric():
+                return aggregate
+            return aggregate.valueList(zeroValue)
         result = []
         for node in eqnNode.childList:
             try:
@@ -464,10 +747,7 @@ class EquationChildRef(EquationFieldRef):
         Arguments:
             refNode -- the node containing the referenced field
         """
-        node = refNode.spotByNumber(0).parentSpot.nodeRef
-        if node.formatRef and node.formatRef.name == self.eqnNodeTypeName:
-            return [node]
-        return []
+        return _parentEqnNodes(refNode, self.eqnNodeTypeName)
 
 
 class EquationChildCountRef(EquationFieldRef):
@@ -495,10 +775,209 @@ class EquationChildCountRef(EquationFieldRef):
         Arguments:
             refNode -- the node containing the referenced field
         """
-        node = refNode.spotByNumber(0).parentSpot.nodeRef
-        if node and node.formatRef.name == self.eqnNodeTypeName:
-            return [node]
-        return []
+        return _parentEqnNodes(refNode, self.eqnNodeTypeName)
+
+
+_skipValue = object()   # stored for children without the field
+
+
+class ChildAggregate:
+    """Class to keep running totals of a field's values in a node's children.
+
+    Stores the math value of each child by ID, so adding, removing or
+    editing a child only adjusts the totals.  Sums are kept exactly, so
+    they are correctly rounded regardless of the child order, like the sums
+    of smaller child lists.  The min and max are found again from the stored
+    values only after a child holding one of them changes.
+    """
+    def __init__(self, parent, fieldName, zeroBlanks=True, noMarkup=True):
+        """Initialize the totals from the parent's current children.
+
+        Arguments:
+            parent -- the node with the children
+            fieldName -- the name of the child field to total
+            zeroBlanks -- replace blank fields with zeros if True
+            noMarkup -- if true, remove html markup
+        """
+        self.parent = parent
+        self.fieldName = fieldName
+        self.zeroBlanks = zeroBlanks
+        self.noMarkup = noMarkup
+        self.values = {}
+        self.intTotal = 0
+        self.floatTotal = fractions.Fraction(0)
+        self.numCount = 0
+        self.floatCount = 0
+        self.otherCount = 0   # blanks, errors, text and non-finite numbers
+        self.minValue = None
+        self.maxValue = None
+        self.extremesValid = True
+        for child in parent.childList:
+            self.addChild(child)
+
+    def childValue(self, child):
+        """Return the math value of a child.
+
+        Returns None or a ValueError for blank or invalid values, and
+        _skipValue if the child doesn't have the field.
+        Arguments:
+            child -- the child node to read
+        """
+        try:
+            return (child.formatRef.fieldDict[self.fieldName].
+                    mathValue(child, self.zeroBlanks, self.noMarkup))
+        except KeyError:
+            return _skipValue if self.zeroBlanks else None
+        except ValueError as err:
+            return err
+
+    def addChild(self, child):
+        """Add a child's value to the totals.
+
+        Arguments:
+            child -- the new child node
+        """
+        value = self.childValue(child)
+        self.values[child.uId] = value
+        if value is _skipValue:
+            return
+        if isinstance(value, int):
+            self.intTotal += value
+        elif isinstance(value, float) and isfinite(value):
+            self.floatTotal += fractions.Fraction(value)
+            self.floatCount += 1
+        else:
+            self.otherCount += 1
+            return
+        self.numCount += 1
+        if not self.extremesValid:
+            return
+        if self.numCount == 1:
+            self.maxValue = self.minValue = value
+            return
+        # equal values with different text need the first one in child order
+        if value > self.maxValue:
+            self.maxValue = value
+        elif value == self.maxValue and not _sameValue(value, self.maxValue):
+            self.extremesValid = False
+        if value < self.minValue:
+            self.minValue = value
+        elif value == self.minValue and not _sameValue(value, self.minValue):
+            self.extremesValid = False
+
+    def removeChild(self, uId):
+        """Remove a child's value from the totals.
+
+        Arguments:
+            uId -- the unique ID of the child
+        """
+        value = self.values.pop(uId)
+        if value is _skipValue:
+            return
+        if isinstance(value, int):
+            self.intTotal -= value
+        elif isinstance(value, float) and isfinite(value):
+            self.floatTotal -= fractions.Fraction(value)
+            self.floatCount -= 1
+        else:
+            self.otherCount -= 1
+            return
+        self.numCount -= 1
+        if value == self.maxValue or value == self.minValue:
+            self.extremesValid = False
+
+    def updateChild(self, child):
+        """Update the totals for a child's changed value.
+
+        Arguments:
+            child -- the changed child node
+        """
+        if child.uId in self.values:
+            self.removeChild(child.uId)
+            self.addChild(child)
+
+    def updateChildList(self):
+        """Update the totals for added and removed children.
+        """
+        childIds = {child.uId for child in self.parent.childList}
+        for uId in [uId for uId in self.values if uId not in childIds]:
+            self.removeChild(uId)
+        for child in self.parent.childList:
+            if child.uId not in self.values:
+                self.addChild(child)
+
+    def isNumeric(self):
+        """Return True if the totals can replace the list of child values.
+        """
+        return self.numCount > 0 and not self.otherCount
+
+    def valueList(self, zeroValue=0):
+        """Return a list of the child values in child order.
+
+        Matches the child reference results: returns None if there are blanks
+        and not zeroBlanks, raises a ValueError for invalid values.
+        Arguments:
+            zeroValue -- the value to use if there are no values
+        """
+        result = []
+        for child in self.parent.childList:
+            value = self.values[child.uId]
+            if value is None:
+                return None
+            if isinstance(value, ValueError):
+                raise value
+            if value is not _skipValue:
+                result.append(value)
+        if not result:
+            result = [zeroValue]
+        return result
+
+    def sum(self):
+        """Return the sum of the numeric child values.
+        """
+        if not self.floatCount:
+            return self.intTotal
+        try:
+            return float(self.intTotal + self.floatTotal)
+        except OverflowError:
+            return builtins.sum(self.valueList())
+
+    def mean(self):
+        """Return the arithmetic average of the numeric child values.
+        """
+        return self.sum() / self.numCount
+
+    def max(self):
+        """Return the largest numeric child value.
+        """
+        if not self.extremesValid:
+            self.findExtremes()
+        return self.maxValue
+
+    def min(self):
+        """Return the smallest numeric child value.
+        """
+        if not self.extremesValid:
+            self.findExtremes()
+        return self.minValue
+
+    def findExtremes(self):
+        """Find the min and max again from the stored values in child order.
+        """
+        values = self.valueList()
+        self.maxValue = builtins.max(values)
+        self.minValue = builtins.min(values)
+        self.extremesValid = True
+
+
+def _sameValue(value, otherValue):
+    """Return True if two equal numbers also give the same result text.
+
+    Arguments:
+        value -- the first number
+        otherValue -- the number to compare
+    """
+    return type(value) is type(otherValue) and str(value) == str(otherValue)
 
 
 class RecursiveEqnRef:
@@ -21,7 +21,8 @@ import datetime
 import platform
 import traceback
 from PyQt6.QtCore import Qt, pyqtSignal, PYQT_VERSION_STR, qVersion
-from PyQt6.QtGui import QFont, QKeySequence, QTextDocument, QTextOption
+from PyQt6.QtGui import (QFont, QFontDatabase, QKeySequence, QTextDocument,
+                         QTextOption)
 from PyQt6.QtWidgets import (QAbstractItemView, QApplication, QButtonGroup,
                              QCheckBox, QComboBox, QDialog, QGridLayout,
                              QGroupBox, QHBoxLayout, QLabel, QLineEdit,
@@ -201,6 +202,10 @@ class FilePropertiesDialog(QDialog):
         self.encryptCheck = QCheckBox(_('Use file &encryption'))
         self.encryptCheck.setChecked(localControl.encrypted)
         groupLayout.addWidget(self.encryptCheck)
+        if localControl.database:
+            # database files are never compressed or encrypted
+            self.compressCheck.setEnabled(False)
+            self.encryptCheck.setEnabled(False)
 
         groupBox = QGroupBox(_('Spell Check'))
         topLayout.addWidget(groupBox)
@@ -544,6 +549,46 @@ class ExceptionDialog(QDialog):
         closeButton.clicked.connect(self.close)
 
 
+class PhaseTimingDialog(QDialog):
+    """Non-modal dialog for showing file open and save phase timing.
+    """
+    def __init__(self, parent=None):
+        """Initialize the timing dialog.
+
+        Arguments:
+            parent -- the parent window
+        """
+        super().__init__(parent)
+        self.setAttribute(Qt.WidgetAttribute.WA_QuitOnClose, False)
+        self.setWindowFlags(Qt.WindowType.Window)
+        self.setWindowTitle(_('TreeLine - File Timing'))
+
+        topLayout = QVBoxLayout(self)
+        self.setLayout(topLayout)
+        self.textBox = QTextEdit()
+        self.textBox.setReadOnly(True)
+        self.textBox.setLineWrapMode(QTextEdit.LineWrapMode.NoWrap)
+        self.textBox.setFont(QFontDatabase.
+                             systemFont(QFontDatabase.SystemFont.FixedFont))
+        topLayout.addWidget(self.textBox)
+
+        ctrlLayout = QHBoxLayout()
+        topLayout.addLayout(ctrlLayout)
+        ctrlLayout.addStretch(0)
+        closeButton = QPushButton(_('&Close'))
+        ctrlLayout.addWidget(closeButton)
+        closeButton.clicked.connect(self.close)
+        self.resize(640, 400)
+
+    def setText(self, text):
+        """Replace the shown timing results.
+
+        Arguments:
+            text -- the results text
+        """
+        self.textBox.setPlainText(text)
+
+
 FindScope = enum.IntEnum('FindScope', 'fullData titlesOnly')
 FindType = enum.IntEnum('FindType', 'keyWords fullWords fullPhrase regExp')
 
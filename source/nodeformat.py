@@ -14,6 +14,7 @@
 
 import re
 import collections
+import itertools
 import os.path
 import sys
 import copy
@@ -32,6 +33,7 @@ _fieldSplitRe = re.compile(r'({\*(?:\**|\?|!|&|#)[\w_\-.]+\*})')
 _fieldPartRe = re.compile(r'{\*(\**|\?|!|&|#)([\w_\-.]+)\*}')
 _endTagRe = re.compile(r'.*(<br[ /]*?>|<BR[ /]*?>|<hr[ /]*?>|<HR[ /]*?>)$')
 _levelFieldRe = re.compile(r'[^0-9]+([0-9]+)$')
+_generationGen = itertools.count()
 
 class NodeFormat:
     """Class to handle node format info
@@ -60,6 +62,9 @@ class NodeFormat:
         self.derivedTypes = []
         self.origOutputLines = [] # lines without bullet or table modifications
         self.sortFields = []   # temporary storage while sorting
+        self.generation = 0    # changes whenever the line formats change
+        self.titleFieldNames = None   # None if titles use outside refs
+        self.outputFieldNames = None  # None if outputs use outside refs
         if addDefaultField:
             self.addFieldIfNew(defaultFieldName)
             self.titleLine = ['{{*{0}*}}'.format(defaultFieldName)]
@@ -168,11 +173,40 @@ class NodeFormat:
             node -- the node used to get data for fields
             spotRef -- optional, used for ancestor field refs
         """
-        line = ''.join([part.outputText(node, True, True, self.formatHtml)
+        line = ''.join([part.outputText(node, True, True, self.formatHtml,
+                                        spotRef)
                         if hasattr(part, 'outputText') else part
                         for part in self.titleLine])
         return line.strip()
 
+    def updateGeneration(self):
+        """Set a new generation number after changes to the line formats.
+
+        Nodes and output caches compare the number to detect stale entries.
+        Also updates the title and output field name lists.
+        """
+        self.generation = next(_generationGen)
+        self.titleFieldNames = self.localFieldNames([self.titleLine])
+        self.outputFieldNames = self.localFieldNames(self.outputLines)
+
+    def localFieldNames(self, lines):
+        """Return a list of field names used in the given parsed lines.
+
+        Return None if the lines use ancestor, child or file info fields that
+        are not stored in the node's own data.
+        Arguments:
+            lines -- a list of parsed format lines
+        """
+        names = []
+        for line in lines:
+            for part in line:
+                if hasattr(part, 'outputText'):
+                    if (self.fieldDict.get(part.name) is not part or
+                        part.useFileInfo):
+                        return None
+                    names.append(part.name)
+        return names
+
     def formatOutput(self, node, plainText=False, keepBlanks=False,
                      spotRef=None):
         """Return a list of formatted text output lines.
@@ -276,6 +310,7 @@ class NodeFormat:
             while field in lineData:
                 lineData.remove(field)
         self.outputLines = [line for line in self.outputLines if line]
+        self.updateGeneration()
         # if len(self.lineList) == 0:
             # self.lineList.append([''])
 
@@ -303,6 +338,7 @@ class NodeFormat:
         if self.origOutputLines:
             self.origOutputLines = [self.parseLine(line) for line in
                                     self.getOutputLines(True)]
+        self.updateGeneration()
 
     def parseLine(self, text):
         """Parse text format line, return list of field types and text.
@@ -377,6 +413,7 @@ class NodeFormat:
         self.titleLine = self.parseLine(text)
         if not self.titleLine:
             self.titleLine = ['']
+        self.updateGeneration()
 
     def changeOutputLines(self, lines, keepBlanks=False):
         """Replace the output format lines with given list.
@@ -396,6 +433,7 @@ class NodeFormat:
         if self.useTables:
             self.origOutputLines = self.outputLines[:]
             self.addTables()
+        self.updateGeneration()
 
     def addOutputLine(self, line):
         """Add an output format line after existing lines.
@@ -406,6 +444,7 @@ class NodeFormat:
         newLine = self.parseLine(line)
         if newLine:
             self.outputLines.append(newLine)
+            self.updateGeneration()
 
     def extractTitleData(self, titleString, data):
         """Modifies the data dictionary based on a title string.
@@ -76,10 +76,15 @@ def setGenOptionDefaults(generalOptions):
     BoolOptionItem(generalOptions, 'EditNumbering', False,
                    _('Features Available'),
                    _('Show numbering fields in the Data Edit view'))
+    BoolOptionItem(generalOptions, 'PhaseTiming', False,
+                   _('Features Available'),
+                   _('Show and log file open and save timing'))
     IntOptionItem(generalOptions, 'UndoLevels', 5, 0, 999, _('Undo Memory'),
                   _('Number of undo levels'), 1)
     IntOptionItem(generalOptions, 'AutoSaveMinutes', 0, 0, 999, _('Auto Save'),
                   _('Minutes between saves\n(set to 0 to disable)'), 1)
+    IntOptionItem(generalOptions, 'CompressLevel', 9, 1, 9, _('Compression'),
+                  _('Compressed file level\n(1 fastest, 9 smallest)'), 1)
     IntOptionItem(generalOptions, 'RecentFiles', 4, 0, 99, _('Recent Files'),
                   _('Number of recent files \nin the file menu'), 1)
     StringOptionItem(generalOptions, 'EditTimeFormat', '%-H:%M:%S', False,
@@ -16,7 +16,6 @@
 
 from array import array
 from time import time
-import struct
 import hashlib
 shaHash = hashlib.sha1
 
@@ -27,24 +26,35 @@ _ivlen = 16
 _maclen = 8
 _state = _hash(repr(time()).encode())
 
-# added by Doug Bell for compatibility with 64-bit systems
-_arraytype = [t for t in 'LIH' if struct.calcsize(t) == 4][0]
-
 try:
     import os
     _pid = repr(os.getpid()).encode()
 except (ImportError, AttributeError):
     _pid = ''
 
-def _expand_key(key, clen):
-    blocks = (clen+19)//20
-    xkey=[]
-    seed=key
-    for i in range(blocks):
-        seed=shaHash(key+seed).digest()
-        xkey.append(seed)
-    j = b''.join(xkey)
-    return array(_arraytype, j)
+# added for bulk speed: key stream blocks per chunk (about 1 MB)
+_chunkblocks = 52429
+
+def _xor_stream(text, key):
+    # XOR the text with the key stream in chunks, using whole-chunk integer
+    # XOR instead of a Python loop over 32-bit words.  Bytewise XOR gives the
+    # same result as the original word array on any byte order.
+    n = len(text)
+    view = memoryview(text)
+    chunklen = 20 * _chunkblocks
+    out = []
+    seed = key
+    for pos in range(0, n, chunklen):
+        chunk = view[pos:pos+chunklen]
+        clen = len(chunk)
+        xkey = []
+        for i in range((clen+19)//20):
+            seed = shaHash(key+seed).digest()
+            xkey.append(seed)
+        xkey = b''.join(xkey)[:clen]
+        out.append((int.from_bytes(chunk, 'little') ^
+                    int.from_bytes(xkey, 'little')).to_bytes(clen, 'little'))
+    return b''.join(out)
 
 def p3_encrypt(plain,key):
     global _state
@@ -72,11 +82,7 @@ def p3_encrypt(plain,key):
     k_enc, k_auth = H(b'enc'+key+nonce), H(b'auth'+key+nonce)
     n=len(plain)                        # cipher size not counting IV
 
-    stream = array(_arraytype, plain+b'0000'[n&3:]) # pad to fill 32-bit words
-    xkey = _expand_key(k_enc, n+4)
-    for i in range(len(stream)):
-        stream[i] = stream[i] ^ xkey[i]
-    ct = nonce + stream.tobytes()[:n]
+    ct = nonce + _xor_stream(plain, k_enc)
     auth = _hmac(ct, k_auth)
     return ct + auth[:_maclen]
 
@@ -86,18 +92,13 @@ def p3_decrypt(cipher,key):
     if n < 0:
         raise CryptError("invalid ciphertext")
     nonce,stream,auth = \
-      cipher[:_ivlen], cipher[_ivlen:-_maclen]+b'0000'[n&3:],cipher[-_maclen:]
+      cipher[:_ivlen], memoryview(cipher)[_ivlen:-_maclen],cipher[-_maclen:]
     k_enc, k_auth = H(b'enc'+key+nonce), H(b'auth'+key+nonce)
     vauth = _hmac (cipher[:-_maclen], k_auth)[:_maclen]
     if auth != vauth:
         raise CryptError("invalid key or ciphertext")
 
-    stream = array(_arraytype, stream)
-    xkey = _expand_key (k_enc, n+4)
-    for i in range (len(stream)):
-        stream[i] = stream[i] ^ xkey[i]
-    plain = stream.tobytes()[:n]
-    return plain
+    return _xor_stream(stream, k_enc)
 
 # RFC 2104 HMAC message authentication code
 # This implementation is faster than Python 2.2's hmac.py, and also works in
@@ -127,18 +128,24 @@ def _hmac(msg, key):
 #
 
 def _time_p3(n=1000,len=20):
-    plain="a"*len
+    plain=b"a"*len
+    t=time()
+    for i in range(n):
+        cipher=p3_encrypt(plain,b"abcdefgh")
+    dt=time()-t
+    print("encrypt p3:", n,len,dt,"sec =",n*len/dt/1e6,"MB/sec")
     t=time()
     for i in range(n):
-        p3_encrypt(plain,b"abcdefgh")
+        p3_decrypt(cipher,b"abcdefgh")
     dt=time()-t
-    print("plain p3:", n,len,dt,"sec =",n*len//dt,"bytes/sec")
+    print("decrypt p3:", n,len,dt,"sec =",n*len/dt/1e6,"MB/sec")
 
 def _speed():
     _time_p3(len=5)
     _time_p3()
     _time_p3(len=200)
     _time_p3(len=2000,n=100)
+    _time_p3(len=50000000,n=1)
 
 def _test():
     e=p3_encrypt
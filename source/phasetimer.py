@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+
+#******************************************************************************
+# phasetimer.py, provides optional timing of file open and save phases
+#
+# TreeLine, an information storage program
+# Copyright (C) 2025, Douglas W. Bell
+#
+# This is free software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License, either Version 2 or any later
+# version.  This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY.  See the included LICENSE file for details.
+#******************************************************************************
+
+import sys
+import time
+import pathlib
+import datetime
+import functools
+import collections
+import logging
+import logging.handlers
+from PyQt6.QtCore import QEventLoop
+from PyQt6.QtWidgets import QApplication
+import options
+import miscdialogs
+import globalref
+
+_logFileName = 'timing.log'
+_maxLogBytes = 200000
+_logBackupCount = 3
+_maxResults = 20
+
+current = None    # the PhaseTimer for the operation being timed, if any
+# the latest finished PhaseTimers from this session, shown in the dialog
+results = collections.deque(maxlen=_maxResults)
+_logger = None
+_dialog = None
+
+
+class PhaseTimer:
+    """Class to record the wall time and allocations of operation phases.
+
+    The allocation count is the net change in Python's allocated memory
+    blocks during each phase.  Results for a repeated phase are summed.
+    """
+    def __init__(self, operation, pathObj):
+        """Initialize the timer and start the first phase.
+
+        Arguments:
+            operation -- a name for the operation being timed
+            pathObj -- the path object of the file being opened or saved
+        """
+        self.operation = operation
+        self.pathObj = pathObj
+        self.startTime = datetime.datetime.now()
+        self.phases = {}   # phase name: [seconds, allocated blocks]
+        self.phaseName = ''
+        self.phaseStart = time.perf_counter()
+        self.phaseBlocks = sys.getallocatedblocks()
+        self.startPhase('start')
+
+    def startPhase(self, name):
+        """End the current phase and start a new one.
+
+        Arguments:
+            name -- the new phase name, None to end without a new phase
+        """
+        now = time.perf_counter()
+        blocks = sys.getallocatedblocks()
+        if self.phaseName:
+            phaseData = self.phases.setdefault(self.phaseName, [0.0, 0])
+            phaseData[0] += now - self.phaseStart
+            phaseData[1] += blocks - self.phaseBlocks
+        self.phaseName = name
+        self.phaseStart = now
+        self.phaseBlocks = blocks
+
+    def timedIter(self, iterable, name):
+        """Return a generator that adds the time in the iterable to a phase.
+
+        The time is moved out of the current phase, but allocations stay in
+        it, since counting blocks is too slow to repeat for every item.
+        Arguments:
+            iterable -- the iterable to step through
+            name -- the phase name for time spent getting items
+        """
+        iterator = iter(iterable)
+        phaseData = self.phases.setdefault(name, [0.0, 0])
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                elapsed = time.perf_counter() - start
+                phaseData[0] += elapsed
+                self.phaseStart += elapsed
+            yield item
+
+    def textLines(self):
+        """Return a list of text lines with the phase results.
+        """
+        lines = ['{0}  {1}  {2}'.format(self.startTime.
+                                        isoformat(' ', 'seconds'),
+                                        self.operation, self.pathObj)]
+        totalTime = 0.0
+        totalBlocks = 0
+        for name, (seconds, blocks) in self.phases.items():
+            lines.append('   {0:30} {1:9.3f} s {2:+12d} blocks'.
+                         format(name, seconds, blocks))
+            totalTime += seconds
+            totalBlocks += blocks
+        lines.append('   {0:30} {1:9.3f} s {2:+12d} blocks'.
+                     format('total', totalTime, totalBlocks))
+        return lines
+
+
+def timedOperation(operation, waitForPaint=False):
+    """Return a decorator that times a method if timing is enabled.
+
+    Uses the method's path object argument or the object's file path in
+    the results.  Nested timed operations are included in the outer one.
+    Arguments:
+        operation -- a name for the operation being timed
+        waitForPaint -- if True, add a phase for the first window painting
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            global current
+            if current or not globalref.genOptions['PhaseTiming']:
+                return func(self, *args, **kwargs)
+            pathObj = getattr(self, 'filePathObj', '')
+            if args and isinstance(args[0], pathlib.PurePath):
+                pathObj = args[0]
+            current = PhaseTimer(operation, pathObj)
+            try:
+                result = func(self, *args, **kwargs)
+                if waitForPaint:
+                    phase('first view paint')
+                    QApplication.processEvents(QEventLoop.ProcessEventsFlag.
+                                               ExcludeUserInputEvents)
+            finally:
+                timer = current
+                current = None
+                timer.startPhase(None)
+                results.append(timer)
+                writeLog(timer)
+                showResults()
+            return result
+        return wrapper
+    return decorator
+
+def phase(name):
+    """Start a new phase in the current timed operation, if any.
+
+    Arguments:
+        name -- the new phase name
+    """
+    if current:
+        current.startPhase(name)
+
+def timedIter(iterable, name):
+    """Return the iterable, with its time added to a phase if timing.
+
+    Arguments:
+        iterable -- the iterable to step through
+        name -- the phase name for time spent getting items
+    """
+    if current:
+        return current.timedIter(iterable, name)
+    return iterable
+
+def writeLog(timer):
+    """Append the timer results to the rotating timing log file.
+
+    Arguments:
+        timer -- the finished PhaseTimer
+    """
+    global _logger
+    if not options.Options.basePath:
+        return
+    if not _logger:
+        try:
+            handler = (logging.handlers.
+                       RotatingFileHandler(str(options.Options.basePath /
+                                               _logFileName),
+                                           maxBytes=_maxLogBytes,
+                                           backupCount=_logBackupCount,
+                                           encoding='utf-8'))
+        except OSError:
+            return
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        _logger = logging.getLogger('treeline.timing')
+        _logger.propagate = False
+        _logger.setLevel(logging.INFO)
+        _logger.addHandler(handler)
+    _logger.info('\n'.join(timer.textLines()))
+
+def showResults():
+    """Show the results from this session in the timing dialog.
+    """
+    global _dialog
+    if not _dialog:
+        _dialog = miscdialogs.PhaseTimingDialog()
+    lines = []
+    for timer in reversed(results):
+        lines.extend(timer.textLines())
+        lines.append('')
+    _dialog.setText('\n'.join(lines))
+    _dialog.show()
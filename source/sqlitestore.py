@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+
+#******************************************************************************
+# sqlitestore.py, provides functions to store TreeLine files in SQLite files
+#
+# TreeLine, an information storage program
+# Copyright (C) 2025, Douglas W. Bell
+#
+# This is free software; you can redistribute it and/or modify it under the
+# terms of the GNU General Public License, either Version 2 or any later
+# version.  This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY.  See the included LICENSE file for details.
+#******************************************************************************
+
+import os.path
+import pathlib
+import json
+import sqlite3
+
+databaseHeader = b'SQLite format 3\x00'
+# the whole tree is still read on open, the database gives incremental saves
+_schema = """
+CREATE TABLE formats (position INTEGER PRIMARY KEY, data TEXT);
+CREATE TABLE nodes (uid TEXT PRIMARY KEY, format TEXT, data TEXT);
+CREATE TABLE children (parent TEXT, position INTEGER, child TEXT,
+                       PRIMARY KEY (parent, position));
+CREATE TABLE properties (name TEXT PRIMARY KEY, value TEXT);
+"""
+# the primary key indexes child links by parent, this finds a node's parents
+_childIndex = 'CREATE INDEX IF NOT EXISTS childlinks ON children (child)'
+
+
+def isDatabase(pathObj):
+    """Return True if the given file is an SQLite database.
+
+    Arguments:
+        pathObj -- the path object of the file to check
+    """
+    try:
+        with pathObj.open('rb') as f:
+            return f.read(len(databaseHeader)) == databaseHeader
+    except OSError:
+        return False
+
+def readFileData(pathObj):
+    """Read a database and return a fileData dict in JSON file format.
+
+    The node records are sorted by ID, matching the JSON files.
+    Raises ValueError if the file is not a valid TreeLine database.
+    Arguments:
+        pathObj -- the path object of the database to read
+    """
+    uri = pathlib.Path(os.path.abspath(pathObj)).as_uri() + '?mode=ro'
+    try:
+        connection = sqlite3.connect(uri, uri=True)
+        try:
+            formats = [json.loads(data) for (data,) in
+                       connection.execute('SELECT data FROM formats '
+                                          'ORDER BY position')]
+            childLists = {}
+            for parentId, childId in connection.execute('SELECT parent, '
+                                                        'child FROM children '
+                                                        'ORDER BY parent, '
+                                                        'position'):
+                childLists.setdefault(parentId, []).append(childId)
+            nodes = [{'format': formatName, 'uid': uId,
+                      'data': json.loads(data),
+                      'children': childLists.get(uId, [])}
+                     for uId, formatName, data in
+                     connection.execute('SELECT uid, format, data FROM nodes '
+                                        'ORDER BY uid')]
+            properties = {name: json.loads(value) for name, value in
+                          connection.execute('SELECT name, value '
+                                             'FROM properties')}
+        finally:
+            connection.close()
+    except sqlite3.Error as err:
+        raise ValueError(str(err))
+    return {'formats': formats, 'nodes': nodes, 'properties': properties}
+
+def writeFileData(pathObj, fileData):
+    """Write a new database with all of the file data.
+
+    Any existing file at the path is replaced.
+    Raises OSError if the write fails.
+    Arguments:
+        pathObj -- the path object of the database to write
+        fileData -- a fileData dict in JSON file format
+    """
+    try:
+        if pathObj.exists():
+            pathObj.unlink()
+        connection = sqlite3.connect(str(pathObj))
+        try:
+            connection.executescript(_schema)
+            connection.execute(_childIndex)
+            with connection:
+                _writeFormatsAndProperties(connection, fileData)
+                _writeNodes(connection, fileData['nodes'])
+        finally:
+            connection.close()
+    except sqlite3.Error as err:
+        raise OSError(str(err))
+
+def updateFileData(pathObj, fileData):
+    """Write changed node records to an existing database.
+
+    The formats and properties are replaced.  Nodes that lost their last
+    parent link, and their orphaned descendants, are removed.
+    All changes are made in one transaction.
+    Raises OSError if the update fails.
+    Arguments:
+        pathObj -- the path object of the database to update
+        fileData -- a fileData dict with the changed and new node records
+    """
+    try:
+        connection = sqlite3.connect(str(pathObj))
+        try:
+            # older files were written without the index
+            connection.execute(_childIndex)
+            with connection:
+                topNodeIds = set(fileData['properties']['topnodes'])
+                removedIds = set()
+                for (value,) in connection.execute("SELECT value FROM "
+                                                   "properties WHERE name = "
+                                                   "'topnodes'"):
+                    removedIds.update(set(json.loads(value)) - topNodeIds)
+                for nodeRecord in fileData['nodes']:
+                    uId = nodeRecord['uid']
+                    removedIds.update({childId for (childId,) in
+                                       connection.execute('SELECT child FROM '
+                                                          'children WHERE '
+                                                          'parent = ?',
+                                                          (uId,))} -
+                                      set(nodeRecord['children']))
+                    connection.execute('DELETE FROM children WHERE '
+                                       'parent = ?', (uId,))
+                connection.execute('DELETE FROM formats')
+                connection.execute('DELETE FROM properties')
+                _writeFormatsAndProperties(connection, fileData)
+                _writeNodes(connection, fileData['nodes'])
+                _removeOrphanNodes(connection, removedIds, topNodeIds)
+        finally:
+            connection.close()
+    except sqlite3.Error as err:
+        raise OSError(str(err))
+
+def _writeFormatsAndProperties(connection, fileData):
+    """Insert rows for the formats and the properties.
+
+    Arguments:
+        connection -- the open database connection
+        fileData -- a fileData dict in JSON file format
+    """
+    connection.executemany('INSERT INTO formats VALUES (?, ?)',
+                           [(pos, json.dumps(formatData, sort_keys=True))
+                            for pos, formatData in
+                            enumerate(fileData['formats'])])
+    connection.executemany('INSERT INTO properties VALUES (?, ?)',
+                           [(name, json.dumps(value, sort_keys=True))
+                            for name, value in
+                            fileData['properties'].items()])
+
+def _writeNodes(connection, nodeRecords):
+    """Insert or replace rows for the node records and their child links.
+
+    Arguments:
+        connection -- the open database connection
+        nodeRecords -- a list of node records in JSON file format
+    """
+    connection.executemany('INSERT OR REPLACE INTO nodes VALUES (?, ?, ?)',
+                           ((record['uid'], record['format'],
+                             json.dumps(record['data'], sort_keys=True))
+                            for record in nodeRecords))
+    connection.executemany('INSERT INTO children VALUES (?, ?, ?)',
+                           ((record['uid'], pos, childId)
+                            for record in nodeRecords
+                            for pos, childId in
+                            enumerate(record['children'])))
+
+def _removeOrphanNodes(connection, candidateIds, topNodeIds):
+    """Delete nodes without parent links and then their orphaned children.
+
+    Trees have no cycles, so every node that is no longer reachable from
+    the top nodes is either a candidate or a descendant of one.
+    Arguments:
+        connection -- the open database connection
+        candidateIds -- IDs of nodes that lost a parent link or top position
+        topNodeIds -- a set of the top node IDs
+    """
+    candidateIds = list(candidateIds)
+    while candidateIds:
+        uId = candidateIds.pop()
+        if uId in topNodeIds or connection.execute('SELECT 1 FROM children '
+                                                   'WHERE child = ? LIMIT 1',
+                                                   (uId,)).fetchone():
+            continue
+        candidateIds.extend(childId for (childId,) in
+                            connection.execute('SELECT child FROM children '
+                                               'WHERE parent = ?', (uId,)))
+        connection.execute('DELETE FROM children WHERE parent = ?', (uId,))
+        connection.execute('DELETE FROM nodes WHERE uid = ?', (uId,))
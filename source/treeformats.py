@@ -210,6 +210,7 @@ class TreeFormats(dict):
         """Update refs used to cycle thru math field evaluations.
         """
         self.mathFieldRefDict = {}
+        self.mathLevelList = []
         allRecursiveRefs = []
         recursiveRefDict = {}
         matheval.RecursiveEqnRef.recursiveRefDict = recursiveRefDict
@@ -1,4 +1,5 @@
-SOURCES =      breadcrumbview.py \
+SOURCES =      batchexport.py \
+               breadcrumbview.py \
                conditional.py \
                configdialog.py \
                dataeditors.py \
@@ -11,6 +12,7 @@ SOURCES =      breadcrumbview.py \
                helpview.py \
                icondict.py \
                imports.py \
+               jsonstream.py \
                matheval.py \
                miscdialogs.py \
                nodeformat.py \
@@ -18,11 +20,13 @@ SOURCES =      breadcrumbview.py \
                optiondefaults.py \
                options.py \
                outputview.py \
+               phasetimer.py \
                p3.py \
                printdata.py \
                printdialogs.py \
                recentfiles.py \
                spellcheck.py \
+               sqlitestore.py \
                titlelistview.py \
                treeformats.py \
                treeline.py \
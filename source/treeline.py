@@ -149,11 +149,41 @@ def handleException(excType, value, tb):
 if __name__ == '__main__':
     """Main event loop for TreeLine
     """
+    batchMode = any(arg.split('=')[0] == '--export' for arg in sys.argv[1:])
+    if batchMode and not os.environ.get('QT_QPA_PLATFORM'):
+        # batch exports do not show windows, so need no display server
+        os.environ['QT_QPA_PLATFORM'] = 'offscreen'
     app = QApplication(sys.argv)
-    parser = argparse.ArgumentParser()
+    parser = argparse.ArgumentParser(epilog='batch export exit codes: '
+                                     '0 success, 1 internal error, '
+                                     '2 usage error, 3 read error, '
+                                     '4 write error')
     parser.add_argument('--lang', help='language code for GUI translation')
     parser.add_argument('fileList', nargs='*', metavar='filename',
                         help='input filename(s) to load')
+    batchGroup = parser.add_argument_group('batch export',
+                                           'export a file without '
+                                           'opening any windows')
+    batchGroup.add_argument('--export', metavar='TYPE',
+                            help='export type, such as htmlSingle, '
+                            'textTableMultiCsv or odfText')
+    batchGroup.add_argument('--output', metavar='PATH',
+                            help='output file (or directory for multiple '
+                            'page exports)')
+    batchGroup.add_argument('--condition', metavar='NAME',
+                            help='export branches matching a saved '
+                            'condition instead of the entire tree')
+    batchGroup.add_argument('--nodes-only', action='store_true',
+                            help='export only the matching nodes, '
+                            'without their descendants')
+    batchGroup.add_argument('--include-root', action='store_true',
+                            help='include the root node in the output')
+    batchGroup.add_argument('--header', action='store_true',
+                            help='add the file\'s print header and footer')
+    batchGroup.add_argument('--columns', type=int, default=1,
+                            help='number of columns for single HTML pages')
+    batchGroup.add_argument('--nav-levels', type=int, default=2,
+                            help='levels in an HTML navigation pane')
     args = parser.parse_args()
     # use abspath() - pathlib's resolve() can be buggy with network drives
     pathObjects = [pathlib.Path(os.path.abspath(path)) for path in
@@ -166,6 +196,13 @@ if __name__ == '__main__':
     globalref.localTextEncoding = locale.getpreferredencoding()
     globalref.lang = lang
 
+    if args.export:
+        import batchexport
+        if args.output:
+            args.output = pathlib.Path(os.path.abspath(args.output))
+        args.fileList = pathObjects
+        sys.exit(batchexport.exportFile(args))
+
     sys.excepthook = handleException
 
     import treemaincontrol
@@ -13,19 +13,27 @@
 #******************************************************************************
 
 import pathlib
+import io
 import json
 import os
 import sys
 import gzip
+import gc
+import shutil
+import stat
 import datetime
 import operator
-from itertools import chain
-from PyQt6.QtCore import QObject, QTimer, Qt, pyqtSignal
+import functools
+from itertools import chain, islice
+from PyQt6.QtCore import (QEventLoop, QObject, QThread, QTimer, Qt,
+                          pyqtSignal)
 from PyQt6.QtGui import QAction, QActionGroup
 from PyQt6.QtWidgets import (QApplication, QDialog, QFileDialog, QMenu,
                              QMessageBox)
 import treemaincontrol
 import treestructure
+import jsonstream
+import sqlitestore
 import treemodel
 import treeformats
 import treenode
@@ -37,9 +45,13 @@ import matheval
 import spellcheck
 import undo
 import p3
+import phasetimer
 import globalref
 
 
+_buildStepNodes = 50000   # nodes created between events in large file opens
+
+
 class TreeLocalControl(QObject):
     """Class to handle controls local to a model/view combination.
 
@@ -69,19 +81,42 @@ class TreeLocalControl(QObject):
         self.fileModTime = fileModTime
         self.filePathObj = (pathlib.Path(fileObj.name) if
                             hasattr(fileObj, 'read') else fileObj)
+        database = False
         if treeStruct:
             self.structure = treeStruct
         elif fileObj:
-            if  hasattr(fileObj, 'read'):
-                fileData = json.load(fileObj)
-            else:
-                with fileObj.open('r', encoding='utf-8') as f:
-                    fileData = json.load(f)
-            self.structure = treestructure.TreeStructure(fileData)
+            phasetimer.phase('JSON parsing')
+            # the garbage collector would repeatedly rescan all of the new
+            # objects while a large file loads, so pause it until finished
+            gcEnabled = gc.isenabled()
+            gc.disable()
+            try:
+                # large trees are finished by finishTreeBuild() once shown
+                buildStructure = functools.partial(treestructure.
+                                                   TreeStructure,
+                                                   deferNodes=True,
+                                                   timer=phasetimer.current)
+                if  hasattr(fileObj, 'read'):
+                    fileData = jsonstream.JsonStreamData(fileObj)
+                    self.structure = buildStructure(fileData)
+                elif sqlitestore.isDatabase(fileObj):
+                    fileData = sqlitestore.readFileData(fileObj)
+                    self.structure = buildStructure(fileData)
+                    database = True
+                else:
+                    progressFunc = functools.partial(self.showReadProgress,
+                                                     fileObj.stat().st_size)
+                    with fileObj.open('r', encoding='utf-8') as f:
+                        fileData = jsonstream.JsonStreamData(f, progressFunc)
+                        self.structure = buildStructure(fileData)
+            finally:
+                if gcEnabled:
+                    gc.enable()
             self.printData.readData(fileData['properties'])
             self.spellCheckLang = fileData['properties'].get('spellchk', '')
         else:
             self.structure = treestructure.TreeStructure(addDefaults=True)
+        phasetimer.phase('model and window setup')
         fileInfoFormat = self.structure.treeFormats.fileInfoFormat
         fileInfoFormat.updateFileInfo(self.filePathObj,
                                       self.structure.fileInfoNode)
@@ -92,6 +127,9 @@ class TreeLocalControl(QObject):
         self.imported = False
         self.compressed = False
         self.encrypted = False
+        self.database = database
+        # the database path that the change records apply to
+        self.databasePathObj = self.filePathObj if database else None
         self.windowList = []
         self.activeWindow = None
         self.findReplaceSpotRef = (None, 0)
@@ -104,6 +142,10 @@ class TreeLocalControl(QObject):
                                                     self)
         self.structure.undoList.altListRef = self.structure.redoList
         self.structure.redoList.altListRef = self.structure.undoList
+        self.fileSaveThread = None
+        # saves, opens and window closes requested while a save is written
+        self.deferredActions = []
+        self.deferredCloses = []
         self.autoSaveTimer = QTimer(self)
         self.autoSaveTimer.timeout.connect(self.autoSave)
         if not globalref.mainControl.activeControl:
@@ -123,7 +165,13 @@ class TreeLocalControl(QObject):
             self.windowList.append(window)
             self.updateWindowCaptions()
             self.activeWindow = window
-        if fileObj and self.structure.childRefErrorNodes:
+        if fileObj and not self.structure.deferredBuild:
+            self.showChildRefErrors()
+
+    def showChildRefErrors(self):
+        """Warn about nodes with bad child references from the file read.
+        """
+        if self.structure.childRefErrorNodes:
             msg = _('Warning - file corruption!\n'
                     'Skipped bad child references in the following nodes:')
             for node in self.structure.childRefErrorNodes:
@@ -131,6 +179,55 @@ class TreeLocalControl(QObject):
             QMessageBox.warning(self.activeWindow, 'TreeLine', msg)
             self.structure.childRefErrorNodes = []
 
+    def finishTreeBuild(self):
+        """Build the rest of a large file's tree after its window is shown.
+
+        The nodes are linked in pieces, painting the windows and showing the
+        progress between them, while holding user input until done.
+        """
+        if not self.structure.deferredBuild:
+            return
+        phasetimer.phase('deferred node construction')
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        numNodes = len(self.structure.pendingRecords)
+        gcEnabled = gc.isenabled()
+        gc.disable()
+        try:
+            while not self.structure.buildDeferredNodes(_buildStepNodes):
+                percent = 100 * len(self.structure.nodeDict) // numNodes
+                self.activeWindow.statusBar().showMessage(_('Building '
+                                                            'tree... {0}%').
+                                                          format(percent))
+                QApplication.processEvents(QEventLoop.ProcessEventsFlag.
+                                           ExcludeUserInputEvents)
+        finally:
+            if gcEnabled:
+                gc.enable()
+            QApplication.restoreOverrideCursor()
+        self.activeWindow.statusBar().clearMessage()
+        for window in self.windowList:
+            window.updateRightViews()
+        self.showChildRefErrors()
+        if self.deferredActions or self.deferredCloses:
+            QTimer.singleShot(0, self.runDeferredActions)
+
+    def showReadProgress(self, fileSize, charsRead):
+        """Show the progress of a file read in the current status bar.
+
+        Does nothing if no window is open yet.
+        Arguments:
+            fileSize -- the file size in bytes
+            charsRead -- the number of characters read so far
+        """
+        control = globalref.mainControl.activeControl
+        if control and control.activeWindow:
+            percent = min(100 * charsRead // max(fileSize, 1), 100)
+            control.activeWindow.statusBar().showMessage(_('Reading file... '
+                                                           '{0}%').
+                                                         format(percent))
+            QApplication.processEvents(QEventLoop.ProcessEventsFlag.
+                                       ExcludeUserInputEvents)
+
     def setWindowSignals(self, window, removeOld=False):
         """Setup signals between the window and this controller.
 
@@ -181,12 +278,13 @@ class TreeLocalControl(QObject):
             setModified -- if True, set the modified flag for this file
         """
         QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        treenode.treeOrderChanged()
         typeChanges = 0
         if self.structure.treeFormats.conditionalTypes:
             for node in self.structure.childList:
                 typeChanges += node.setDescendantConditionalTypes(self.
                                                                   structure)
-        self.updateAllMathFields()
+        self.updateMathFields()
         for window in self.windowList:
             window.updateTree()
             if window != self.activeWindow or typeChanges:
@@ -218,10 +316,11 @@ class TreeLocalControl(QObject):
             setModified -- if True, set the modified flag for this file
         """
         QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        treenode.treeOrderChanged()
         if self.structure.treeFormats.conditionalTypes:
             for node in self.structure.childList:
                 node.setDescendantConditionalTypes(self.structure)
-        self.updateAllMathFields()
+        self.updateMathFields()
         for window in self.windowList:
             window.updateTree()
             if window.treeFilterView:
@@ -231,27 +330,67 @@ class TreeLocalControl(QObject):
         if setModified:
             self.setModified()
         # self.structure.debugCheck()
+        if treestructure.debugSpots:
+            self.structure.verifySpots()
         QApplication.restoreOverrideCursor()
 
+    def updateMathFields(self):
+        """Recalculate the math fields affected by changes since the last
+        update.
+
+        Recalculates all math fields after format changes or if requested.
+        """
+        if self.structure.mathFullUpdateNeeded():
+            self.updateAllMathFields()
+        else:
+            phasetimer.phase('updateChangedMathFields')
+            self.structure.updateChangedMathFields()
+            phasetimer.phase('view updates')
+
     def updateAllMathFields(self):
         """Recalculate all math fields in the entire tree.
+
+        Levels without references to fields of other nodes in the same level
+        are evaluated in batches by node type.  Others are evaluated node by
+        node in the level's direction.
         """
+        phasetimer.phase('updateAllMathFields')
+        self.structure.clearChildAggregates()
+        typeNodes = None
         for eqnRefDict in self.structure.treeFormats.mathLevelList:
-            if list(eqnRefDict.values())[0][0].evalDirection != (matheval.
-                                                                 EvalDir.
-                                                                 upward):
+            if matheval.batchEvaluable(eqnRefDict):
+                if typeNodes is None:
+                    typeNodes = self.structure.nodesByType()
+                for typeName, eqnRefs in eqnRefDict.items():
+                    nodes = typeNodes.get(typeName)
+                    if not nodes:
+                        continue
+                    for eqnRef in eqnRefs:
+                        field = eqnRef.eqnField
+                        values = field.equationValues(nodes, self.structure.
+                                                      mathZeroBlanks)
+                        for node, value in zip(nodes, values):
+                            self.structure.setMathValue(node, field.name,
+                                                        value)
+            elif list(eqnRefDict.values())[0][0].evalDirection != (matheval.
+                                                                   EvalDir.
+                                                                   upward):
                 for node in self.structure.descendantGen():
                     for eqnRef in eqnRefDict.get(node.formatRef.name, []):
-                        node.data[eqnRef.eqnField.name] = (eqnRef.eqnField.
-                                                           equationValue(node))
+                        self.structure.setMathValue(node, eqnRef.eqnField.
+                                                    name, eqnRef.eqnField.
+                                                    equationValue(node))
             else:
                 spot = self.structure.structSpot().lastDescendantSpot()
                 while spot:
                     node = spot.nodeRef
                     for eqnRef in eqnRefDict.get(node.formatRef.name, []):
-                        node.data[eqnRef.eqnField.name] = (eqnRef.eqnField.
-                                                           equationValue(node))
+                        self.structure.setMathValue(node, eqnRef.eqnField.
+                                                    name, eqnRef.eqnField.
+                                                    equationValue(node))
                     spot = spot.prevTreeSpot()
+        self.structure.clearMathChanges()
+        phasetimer.phase('view updates')
 
     def updateCommandsAvail(self):
         """Set commands available based on node selections.
@@ -366,6 +505,16 @@ class TreeLocalControl(QObject):
         Arguments:
             window -- the window being closed
         """
+        if globalref.mainControl.creatingLocalControlFlag:
+            # another file is being read, which may reuse this window
+            window.allowCloseFlag = False
+            return
+        if self.isBusy():
+            # close the window once the save or build is done
+            window.allowCloseFlag = False
+            if window not in self.deferredCloses:
+                self.deferredCloses.append(window)
+            return
         if len(self.windowList) > 1:
             self.windowList.remove(window)
             # set active to one not closing to avoid errors while changing
@@ -408,13 +557,43 @@ class TreeLocalControl(QObject):
         for window in self.windowList:
             window.close()
 
+    def isBusy(self):
+        """Return True while a save is written or a large tree is built.
+
+        Their event loops still deliver window close events, socket opens
+        and timers, so those closes, saves and opens are deferred.
+        """
+        return (self.fileSaveThread is not None or
+                self.structure.deferredBuild)
+
+    def runDeferredActions(self):
+        """Run the saves and opens, then the closes requested while busy.
+
+        The closes are last, since closing the last window ends the
+        application.  A window reused by an open is not closed.
+        """
+        actions = self.deferredActions
+        self.deferredActions = []
+        for action in actions:
+            action()
+        windows = self.deferredCloses
+        self.deferredCloses = []
+        for window in windows:
+            # skip windows that an open has reused for another file
+            if (self in globalref.mainControl.localControls and
+                    window in self.windowList):
+                window.close()
+
     def autoSave(self):
         """Save a backup file if appropriate.
 
         Called from the timer.
         """
-        if self.filePathObj and not self.imported:
-            self.fileSave(True)
+        if self.filePathObj and not self.imported and not self.fileSaveThread:
+            if self.encrypted:
+                self.fileSave(True)   # a plain text journal would be unsafe
+            else:
+                self.journalSave()
 
     def resetAutoSave(self):
         """Start or stop the auto-save timer based on file modified status.
@@ -428,15 +607,37 @@ class TreeLocalControl(QObject):
         else:
             self.deleteAutoSaveFile()
 
+    def journalSave(self):
+        """Append the nodes changed since the last auto-save to a journal.
+
+        The journal is replayed onto the last full save to restore a backup.
+        """
+        journalPath = pathlib.Path(str(self.filePathObj) + '~journal')
+        # database saves write the changes since the last save, so keep them
+        fileData = self.structure.journalData(not self.database)
+        fileData['properties'].update(self.printData.fileData())
+        if self.spellCheckLang:
+            fileData['properties']['spellchk'] = self.spellCheckLang
+        try:
+            with journalPath.open('a', encoding='utf-8', newline='\n') as f:
+                f.write(json.dumps(fileData, sort_keys=True) + '\n')
+        except IOError:
+            QMessageBox.warning(self.activeWindow, 'TreeLine',
+                                _('Error - could not write to {}').
+                                format(journalPath))
+
     def deleteAutoSaveFile(self):
-        """Delete an auto save file if it exists.
+        """Delete auto save backup and journal files if they exist.
         """
-        filePath = pathlib.Path(str(self.filePathObj) + '~')
-        if self.filePathObj and filePath.is_file():
-            try:
-                filePath.unlink()
-            except OSError:
-                QMessageBox.warning(self.activeWindow, 'TreeLine',
+        if not self.filePathObj:
+            return
+        for suffix in ('~', '~journal'):
+            filePath = pathlib.Path(str(self.filePathObj) + suffix)
+            if filePath.is_file():
+                try:
+                    filePath.unlink()
+                except OSError:
+                    QMessageBox.warning(self.activeWindow, 'TreeLine',
                                   _('Error - could not delete backup file {}').
                                   format(filePath))
 
@@ -767,12 +968,18 @@ class TreeLocalControl(QObject):
             self.fontSizeSubMenu.setIcon(fontIcon)
         self.allActions.update(localActions)
 
+    @phasetimer.timedOperation('Save')
     def fileSave(self, backupFile=False):
         """Save the currently active file.
 
         Arguments:
             backupFile -- if True, write auto-save backup file instead
         """
+        if self.isBusy():
+            # save again once done, since the running save may be a backup
+            if not backupFile and self.fileSave not in self.deferredActions:
+                self.deferredActions.append(self.fileSave)
+            return
         if not self.filePathObj or self.imported:
             self.fileSaveAs()
             return
@@ -788,58 +995,70 @@ class TreeLocalControl(QObject):
                     # user cancelled the save
                     return
         QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        phasetimer.phase('file data snapshot')
         savePathObj = self.filePathObj
         if backupFile:
             savePathObj = pathlib.Path(str(savePathObj) + '~')
         else:
             self.structure.purgeOldFieldData()
-        fileData = self.structure.fileData()
+        # copy node data so the save thread has an unchanging snapshot
+        incremental = (self.database and not backupFile and
+                       savePathObj == self.databasePathObj and
+                       not self.structure.fullSaveNeeded)
+        if incremental:
+            fileData = self.structure.journalData(False)
+            for nodeRecord in fileData['nodes']:
+                nodeRecord['data'] = nodeRecord['data'].copy()
+        else:
+            fileData = self.structure.fileData(True)
         fileData['properties'].update(self.printData.fileData())
         if self.spellCheckLang:
             fileData['properties']['spellchk'] = self.spellCheckLang
-        if not self.compressed and not self.encrypted:
-            indent = 3 if globalref.genOptions['PrettyPrint'] else 0
-            try:
-                with savePathObj.open('w', encoding='utf-8',
-                                      newline='\n') as f:
-                    json.dump(fileData, f, indent=indent, sort_keys=True)
-            except IOError:
+        password = None
+        if self.encrypted:
+            password = (globalref.mainControl.passwords.
+                        get(self.filePathObj, ''))
+            if not password:
                 QApplication.restoreOverrideCursor()
-                QMessageBox.warning(self.activeWindow, 'TreeLine',
-                                    _('Error - could not write to {}').
-                                    format(savePathObj))
-                return
-        else:
-            data = json.dumps(fileData, indent=0, sort_keys=True).encode()
-            if self.compressed:
-                data = gzip.compress(data)
-            if self.encrypted:
-                password = (globalref.mainControl.passwords.
-                            get(self.filePathObj, ''))
-                if not password:
-                    QApplication.restoreOverrideCursor()
-                    dialog = miscdialogs.PasswordDialog(True, '',
-                                                        self.activeWindow)
-                    if dialog.exec() != QDialog.DialogCode.Accepted:
-                        return
-                    QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
-                    password = dialog.password
-                    if miscdialogs.PasswordDialog.remember:
-                        globalref.mainControl.passwords[self.
-                                                        filePathObj] = password
-                data = (treemaincontrol.encryptPrefix +
-                        p3.p3_encrypt(data, password.encode()))
-            try:
-                with savePathObj.open('wb') as f:
-                    f.write(data)
-            except IOError:
-                QApplication.restoreOverrideCursor()
-                QMessageBox.warning(self.activeWindow, 'TreeLine',
-                                    _('Error - could not write to {}').
-                                    format(savePathObj))
-                return
+                dialog = miscdialogs.PasswordDialog(True, '',
+                                                    self.activeWindow)
+                if dialog.exec() != QDialog.DialogCode.Accepted:
+                    return
+                QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+                password = dialog.password
+                if miscdialogs.PasswordDialog.remember:
+                    globalref.mainControl.passwords[self.
+                                                    filePathObj] = password
+        phasetimer.phase('serialize and write')
+        indent = 3 if globalref.genOptions['PrettyPrint'] else 0
+        self.fileSaveThread = FileSaveThread(fileData, savePathObj, indent,
+                                             self.compressed, password,
+                                             globalref.
+                                             genOptions['CompressLevel'],
+                                             self.database, incremental)
+        # keep windows painted, but hold user input until the save is done
+        eventLoop = QEventLoop()
+        self.fileSaveThread.finished.connect(eventLoop.quit)
+        self.fileSaveThread.start()
+        eventLoop.exec(QEventLoop.ProcessEventsFlag.ExcludeUserInputEvents)
+        saveError = self.fileSaveThread.saveError
+        self.fileSaveThread = None
+        if self.deferredActions or self.deferredCloses:
+            QTimer.singleShot(0, self.runDeferredActions)
         QApplication.restoreOverrideCursor()
+        if saveError:
+            if not isinstance(saveError, OSError):
+                # show unexpected errors with the usual exception handling
+                raise saveError
+            QMessageBox.warning(self.activeWindow, 'TreeLine',
+                                _('Error - could not write to {}').
+                                format(savePathObj))
+            return
+        phasetimer.phase('file info update')
         if not backupFile:
+            self.structure.clearChanges()
+            self.databasePathObj = (self.filePathObj if self.database
+                                    else None)
             self.fileModTime = datetime.datetime.now()
             fileInfoFormat = self.structure.treeFormats.fileInfoFormat
             fileInfoFormat.updateFileInfo(self.filePathObj,
@@ -847,6 +1066,22 @@ class TreeLocalControl(QObject):
             self.setModified(False)
             self.imported = False
             self.activeWindow.statusBar().showMessage(_('File saved'), 3000)
+        else:
+            self.deleteJournal()
+
+    def deleteJournal(self):
+        """Delete an auto-save journal made obsolete by a full backup file.
+
+        The journal's cleared change records are restored by marking all
+        nodes, so a later journal entry is complete.
+        """
+        journalPath = pathlib.Path(str(self.filePathObj) + '~journal')
+        if journalPath.is_file():
+            try:
+                journalPath.unlink()
+            except OSError:
+                return
+            self.structure.markAllChanged()
 
     def fileSaveAs(self):
         """Prompt for a new file name and save the file.
@@ -854,11 +1089,13 @@ class TreeLocalControl(QObject):
         oldPathObj = self.filePathObj
         oldModifiedFlag = self.modified
         oldImportFlag = self.imported
+        oldStorageFlags = (self.compressed, self.encrypted, self.database)
         self.modified = True
         self.imported = False
         filters = ';;'.join((globalref.fileFilters['trlnsave'],
                              globalref.fileFilters['trlngz'],
-                             globalref.fileFilters['trlnenc']))
+                             globalref.fileFilters['trlnenc'],
+                             globalref.fileFilters['trlndb']))
         initFilter = globalref.fileFilters['trlnsave']
         defaultPathObj = globalref.mainControl.defaultPathObj()
         if defaultPathObj.is_file():
@@ -871,13 +1108,17 @@ class TreeLocalControl(QObject):
         if newPath:
             self.fileModTime = None
             self.filePathObj = pathlib.Path(newPath)
-            if not self.filePathObj.suffix:
-                self.filePathObj = self.filePathObj.with_suffix('.trln')
             if selectFilter != initFilter:
                 self.compressed = (selectFilter ==
                                    globalref.fileFilters['trlngz'])
                 self.encrypted = (selectFilter ==
                                   globalref.fileFilters['trlnenc'])
+                self.database = (selectFilter ==
+                                 globalref.fileFilters['trlndb'])
+            if not self.filePathObj.suffix:
+                self.filePathObj = self.filePathObj.with_suffix('.trlndb' if
+                                                                self.database
+                                                                else '.trln')
             self.fileSave()
             if not self.modified:
                 globalref.mainControl.recentFiles.addItem(self.filePathObj)
@@ -886,6 +1127,7 @@ class TreeLocalControl(QObject):
         self.filePathObj = oldPathObj
         self.modified = oldModifiedFlag
         self.imported = oldImportFlag
+        self.compressed, self.encrypted, self.database = oldStorageFlags
 
     def fileExport(self):
         """Export the file in various other formats.
@@ -1276,8 +1518,11 @@ class TreeLocalControl(QObject):
         QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
         newStructure = None
         try:
-            with open(fileName, 'r', encoding='utf-8') as f:
-                fileData = json.load(f)
+            if sqlitestore.isDatabase(pathlib.Path(fileName)):
+                fileData = sqlitestore.readFileData(pathlib.Path(fileName))
+            else:
+                with open(fileName, 'r', encoding='utf-8') as f:
+                    fileData = json.load(f)
             newStructure = treestructure.TreeStructure(fileData,
                                                        addSpots=False)
         except IOError:
@@ -1316,6 +1561,7 @@ class TreeLocalControl(QObject):
     def dataRegenRefs(self):
         """Force update of all conditional types & math fields.
         """
+        self.structure.mathFullUpdate = True
         self.updateAll(False)
 
     def dataCloneMatches(self):
@@ -1379,6 +1625,7 @@ class TreeLocalControl(QObject):
                     numChanges += 1
                     linkedNode = spot.nodeRef
                     linkedNode.spotRefs.remove(spot)
+                    linkedNode.clearSpotCache()
                     newNode = treenode.TreeNode(linkedNode.formatRef)
                     newNode.data = linkedNode.data.copy()
                     newNode.childList = linkedNode.childList[:]
@@ -1732,3 +1979,133 @@ class TreeLocalControl(QObject):
         self.selectRootSpot()
         window.show()
         window.updateRightViews()
+
+
+class FileSaveThread(QThread):
+    """Thread to serialize, compress, encrypt and write a file.
+
+    Writes to a temporary file that replaces the destination when complete,
+    so an interrupted save does not damage the previous file.  Incremental
+    database updates are written in place, in a single transaction.
+    """
+    def __init__(self, fileData, pathObj, indent=0, compressed=False,
+                 password=None, compressLevel=9, database=False,
+                 incremental=False, parent=None):
+        """Initialize the save thread.
+
+        Arguments:
+            fileData -- the JSON file data dict, not changed while saving
+            pathObj -- the path object of the file to write
+            indent -- the JSON indent for uncompressed, unencrypted files
+            compressed -- if True, compress the file
+            password -- if given, encrypt the file with this password
+            compressLevel -- the gzip compression level, 1 to 9
+            database -- if True, write an SQLite database file
+            incremental -- if True, update the database with changed nodes
+            parent -- a parent object if given
+        """
+        super().__init__(parent)
+        self.fileData = fileData
+        self.pathObj = pathObj
+        self.indent = indent
+        self.compressed = compressed
+        self.password = password
+        self.compressLevel = compressLevel
+        self.database = database
+        self.incremental = incremental
+        self.saveError = None
+
+    def run(self):
+        """Write the file, setting saveError to the exception if it fails.
+
+        Any exception is kept for the GUI thread, since an uncaught one
+        would end the thread silently and the save would look successful.
+        The data is written to a temporary file that replaces the original,
+        with the original's permissions and, where allowed, its owner.
+        Other attributes, like access control lists, are not copied.
+        """
+        # write through any symbolic link instead of replacing the link
+        pathObj = pathlib.Path(os.path.realpath(self.pathObj))
+        tmpPathObj = pathObj.with_name(pathObj.name + '.tmp')
+        if self.incremental:
+            try:
+                sqlitestore.updateFileData(pathObj, self.fileData)
+            except Exception as err:
+                self.saveError = err
+            return
+        try:
+            if self.database:
+                sqlitestore.writeFileData(tmpPathObj, self.fileData)
+            elif not self.compressed and not self.password:
+                with tmpPathObj.open('w', encoding='utf-8',
+                                     newline='\n') as f:
+                    writeJson(self.fileData, f, self.indent)
+            elif not self.password:
+                # stream the JSON text into the compressor in small pieces,
+                # with no file name in the gzip header, like gzip.compress
+                with tmpPathObj.open('wb') as rawFile:
+                    with gzip.GzipFile('', 'wb', self.compressLevel,
+                                       rawFile) as gzipFile:
+                        with io.TextIOWrapper(gzipFile, encoding='utf-8',
+                                              newline='\n') as f:
+                            writeJson(self.fileData, f)
+            else:
+                # encryption authenticates the whole file, so it is built
+                # in memory
+                data = json.dumps(self.fileData, indent=0,
+                                  sort_keys=True).encode()
+                if self.compressed:
+                    data = gzip.compress(data, self.compressLevel)
+                data = (treemaincontrol.encryptPrefix +
+                        p3.p3_encrypt(data, self.password.encode()))
+                with tmpPathObj.open('wb') as f:
+                    f.write(data)
+            try:
+                fileStat = pathObj.stat()
+            except OSError:
+                fileStat = None   # new file, keep default permissions
+            if fileStat:
+                os.chmod(tmpPathObj, stat.S_IMODE(fileStat.st_mode))
+                try:
+                    os.chown(tmpPathObj, fileStat.st_uid, fileStat.st_gid)
+                except (AttributeError, OSError):
+                    pass   # not available or not allowed for this user
+            try:
+                os.replace(tmpPathObj, pathObj)
+            except OSError:
+                if not fileStat:
+                    raise
+                # the file may be held open by another program (on Windows)
+                # or it may not be replaceable, so write over it in place
+                try:
+                    shutil.copyfile(tmpPathObj, pathObj)
+                except OSError as err:
+                    # keep the complete temporary file as a recovery copy
+                    self.saveError = err
+                    return
+                tmpPathObj.unlink()
+        except Exception as err:
+            self.saveError = err
+            try:
+                tmpPathObj.unlink()
+            except OSError:
+                pass
+
+
+def writeJson(fileData, fileObj, indent=0):
+    """Write file data as sorted JSON text in pieces of limited size.
+
+    Gives the same text as json.dump, but joins the many small encoder
+    chunks before writing, which is faster than writing each one.
+    Arguments:
+        fileData -- the JSON file data dict
+        fileObj -- the text file object to write to
+        indent -- the JSON indent
+    """
+    encoder = json.JSONEncoder(indent=indent, sort_keys=True)
+    chunks = encoder.iterencode(fileData)
+    while True:
+        text = ''.join(islice(chunks, 10000))
+        if not text:
+            return
+        fileObj.write(text)
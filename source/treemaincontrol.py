@@ -17,11 +17,15 @@ import pathlib
 import os.path
 import ast
 import io
+import json
+import operator
 import gzip
 import zlib
 import datetime
 import platform
-from PyQt6.QtCore import QIODevice, QObject, Qt, PYQT_VERSION_STR, qVersion
+import functools
+from PyQt6.QtCore import (QIODevice, QObject, QTimer, Qt, PYQT_VERSION_STR,
+                          qVersion)
 from PyQt6.QtGui import QAction, QColor, QFont, QPalette
 from PyQt6.QtNetwork import QLocalServer, QLocalSocket
 from PyQt6.QtWidgets import (QApplication, QDialog, QFileDialog, QMessageBox,
@@ -32,6 +36,7 @@ import options
 import optiondefaults
 import recentfiles
 import p3
+import sqlitestore
 import icondict
 import imports
 import configdialog
@@ -39,6 +44,8 @@ import miscdialogs
 import conditional
 import colorset
 import helpview
+import treeoutput
+import phasetimer
 try:
     from __main__ import __version__, __author__
 except ImportError:
@@ -70,6 +77,8 @@ class TreeMainControl(QObject):
         super().__init__(parent)
         self.localControls = []
         self.activeControl = None
+        self.pendingOpenPaths = []
+        self.priorityControl = None
         self.trayIcon = None
         self.isTrayMinimized = False
         self.configDialog = None
@@ -157,11 +166,31 @@ class TreeMainControl(QObject):
             self.createTrayIcon()
         QApplication.instance().focusChanged.connect(self.updateActionsAvail)
         if pathObjects:
-            for pathObj in pathObjects:
-                self.openFile(pathObj, True)
+            # open the last file first, since it ends up active, then open
+            # the others from the event loop, showing each when it is ready
+            self.openFile(pathObjects[-1], True)
+            self.priorityControl = self.activeControl
+            self.pendingOpenPaths = pathObjects[:-1]
+            if self.pendingOpenPaths:
+                QTimer.singleShot(0, self.openPendingFile)
         else:
             self.createLocalControl()
 
+    def openPendingFile(self):
+        """Open the next file from the command line list.
+
+        Called from a timer, so earlier windows are shown and can be used
+        between files.  The first opened file is made active after the last.
+        """
+        self.openFile(self.pendingOpenPaths.pop(0), True)
+        if self.pendingOpenPaths:
+            # set after the open, so it doesn't fire while a file is read
+            QTimer.singleShot(0, self.openPendingFile)
+        elif self.priorityControl in self.localControls:
+            self.priorityControl.activeWindow.activateAndRaise()
+            self.updateLocalControlRef(self.priorityControl)
+            self.priorityControl = None
+
     def getSocket(self):
         """Open a socket from an attempt to open a second Treeline instance.
 
@@ -244,6 +273,7 @@ class TreeMainControl(QObject):
             pathObj = pathObj.parent
         return pathObj
 
+    @phasetimer.timedOperation('Open', True)
     def openFile(self, pathObj, forceNewWindow=False, checkModified=False,
                  importOnFail=True):
         """Open the file given by path if not already open.
@@ -255,6 +285,21 @@ class TreeMainControl(QObject):
             checkModified -- if True & not new win, prompt if file modified
             importOnFail -- if True, prompts for import on non-TreeLine files
         """
+        openArgs = (pathObj, forceNewWindow, checkModified, importOnFail)
+        if self.creatingLocalControlFlag:
+            # another file is being read, so try again after it is open
+            QTimer.singleShot(100, functools.partial(self.openFile,
+                                                     *openArgs))
+            return
+        busyControls = [control for control in self.localControls if
+                        control.isBusy()]
+        if busyControls:
+            # open once the save or build is done, since it may reuse its
+            # window
+            busyControls[0].deferredActions.append(functools.
+                                                   partial(self.openFile,
+                                                           *openArgs))
+            return
         match = [control for control in self.localControls if
                  pathObj == control.filePathObj]
         if match and self.activeControl not in match:
@@ -403,6 +448,7 @@ class TreeMainControl(QObject):
     def checkAutoSave(self, pathObj):
         """Check for presence of auto save file & prompt user.
 
+        Restores from either a full backup file or a journal of changes.
         Return True if OK to contimue, False if aborting or already loaded.
         Arguments:
             pathObj -- the base path object to search for a backup
@@ -411,12 +457,14 @@ class TreeMainControl(QObject):
             return True
         basePath = pathObj
         pathObj = pathlib.Path(str(pathObj) + '~')
-        if not pathObj.is_file():
+        journalPath = pathlib.Path(str(basePath) + '~journal')
+        if not pathObj.is_file() and not journalPath.is_file():
             return True
         msgBox = QMessageBox(QMessageBox.Icon.Information, 'TreeLine',
                              _('Backup file "{}" exists.\nA previous '
                                'session may have crashed').
-                             format(pathObj),
+                             format(pathObj if pathObj.is_file() else
+                                    journalPath),
                              QMessageBox.StandardButton.NoButton,
                              QApplication.activeWindow())
         restoreButton = msgBox.addButton(_('&Restore Backup'),
@@ -427,9 +475,22 @@ class TreeMainControl(QObject):
                                         QMessageBox.ButtonRole.RejectRole)
         msgBox.exec()
         if msgBox.clickedButton() == restoreButton:
+            replayed = journalPath.is_file()
+            if (replayed and pathObj.is_file() and pathObj.stat().st_mtime >=
+                journalPath.stat().st_mtime):
+                # a full backup written after the journal replaces it
+                replayed = False
+                try:
+                    journalPath.unlink()
+                except OSError:
+                    pass
+            if replayed and not self.replayJournal(basePath, journalPath,
+                                                   pathObj):
+                return False
             self.openFile(pathObj)
             if self.activeControl.filePathObj != pathObj:
                 return False
+            database = sqlitestore.isDatabase(basePath)
             try:
                 basePath.unlink()
                 pathObj.rename(basePath)
@@ -443,19 +504,106 @@ class TreeMainControl(QObject):
             self.activeControl.updateWindowCaptions()
             self.recentFiles.removeItem(pathObj)
             self.recentFiles.addItem(basePath)
+            if replayed:
+                # update math fields & conditional types of unjournaled nodes
+                self.activeControl.structure.mathFullUpdate = True
+                self.activeControl.updateAll()
+            if not database:
+                self.activeControl.database = False
+                self.activeControl.databasePathObj = None
+            elif self.activeControl.database:
+                self.activeControl.databasePathObj = basePath
+            else:
+                # write the restored JSON file back as a database
+                self.activeControl.database = True
+                self.activeControl.fileSave()
             return False
         elif msgBox.clickedButton() == deleteButton:
-            try:
-                pathObj.unlink()
-            except OSError:
-                QMessageBox.warning(QApplication.activeWindow(),
+            for backupPath in (pathObj, journalPath):
+                if not backupPath.is_file():
+                    continue
+                try:
+                    backupPath.unlink()
+                except OSError:
+                    QMessageBox.warning(QApplication.activeWindow(),
                                   'TreeLine',
                                   _('Error - could not remove backup file {}').
-                                  format(pathObj))
+                                  format(backupPath))
         else:   # cancel button
             return False
         return True
 
+    def replayJournal(self, basePath, journalPath, backupPath):
+        """Apply an auto-save journal to the last full save of a file.
+
+        Writes the result to the backup path and removes the journal.
+        Return True if successful.
+        Arguments:
+            basePath -- the path object of the last full save
+            journalPath -- the path object of the journal
+            backupPath -- the path object to write the restored file to
+        """
+        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
+        try:
+            compressed = False
+            if sqlitestore.isDatabase(basePath):
+                fileData = sqlitestore.readFileData(basePath)
+            else:
+                # an encrypted file is journaled after encryption is turned
+                # off, and the restored file is not encrypted
+                with basePath.open('rb') as baseFile:
+                    fileObj, encrypted = self.decryptFile(baseFile)
+                    if not fileObj:
+                        # the password prompt was cancelled
+                        QApplication.restoreOverrideCursor()
+                        return False
+                    fileObj, compressed = self.decompressFile(fileObj)
+                    fileData = json.load(fileObj)
+            nodeRecords = {record['uid']: record for record in
+                           fileData['nodes']}
+            with journalPath.open('r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break   # skip a partial line from an interrupted write
+                    for record in entry['nodes']:
+                        nodeRecords[record['uid']] = record
+                    fileData['formats'] = entry['formats']
+                    fileData['properties'] = entry['properties']
+            # keep only the nodes still reachable from the top nodes
+            nodeList = []
+            foundIds = set()
+            idStack = list(fileData['properties']['topnodes'])
+            while idStack:
+                uId = idStack.pop()
+                if uId in foundIds or uId not in nodeRecords:
+                    continue
+                foundIds.add(uId)
+                nodeList.append(nodeRecords[uId])
+                idStack.extend(nodeRecords[uId].get('children', []))
+            fileData['nodes'] = sorted(nodeList,
+                                       key=operator.itemgetter('uid'))
+            indent = 3 if (globalref.genOptions['PrettyPrint'] and
+                           not compressed) else 0
+            with backupPath.open('wb') as rawFile:
+                if compressed:
+                    rawFile = gzip.GzipFile('', 'wb', globalref.
+                                            genOptions['CompressLevel'],
+                                            rawFile)
+                with io.TextIOWrapper(rawFile, encoding='utf-8',
+                                      newline='\n') as f:
+                    treelocalcontrol.writeJson(fileData, f, indent)
+            journalPath.unlink()
+        except (OSError, ValueError, KeyError, TypeError):
+            QApplication.restoreOverrideCursor()
+            QMessageBox.warning(QApplication.activeWindow(), 'TreeLine',
+                                _('Error - could not restore backup journal '
+                                  '{}').format(journalPath))
+            return False
+        QApplication.restoreOverrideCursor()
+        return True
+
     def createLocalControl(self, pathObj=None, treeStruct=None,
                            forceNewWindow=False, fileModTime=None):
         """Create a new local control object and add it to the list.
@@ -468,17 +616,22 @@ class TreeMainControl(QObject):
             fileModTime -- file modified time for external modification checks
         """
         self.creatingLocalControlFlag = True
-        localControl = treelocalcontrol.TreeLocalControl(self.allActions,
-                                                         pathObj, treeStruct,
-                                                         fileModTime,
-                                                         forceNewWindow)
+        try:
+            localControl = treelocalcontrol.TreeLocalControl(self.allActions,
+                                                             pathObj,
+                                                             treeStruct,
+                                                             fileModTime,
+                                                             forceNewWindow)
+        finally:
+            # also reset for files that can't be read
+            self.creatingLocalControlFlag = False
         localControl.controlActivated.connect(self.updateLocalControlRef)
         localControl.controlClosed.connect(self.removeLocalControlRef)
         self.localControls.append(localControl)
         self.updateLocalControlRef(localControl)
-        self.creatingLocalControlFlag = False
         localControl.updateRightViews()
         localControl.updateCommandsAvail()
+        localControl.finishTreeBuild()
 
     def updateLocalControlRef(self, localControl):
         """Set the given local control as active.
@@ -504,6 +657,7 @@ class TreeMainControl(QObject):
             self.localControls.remove(localControl)
         except ValueError:
             return  # skip for unreporducible bug - odd race condition?
+        treeoutput.clearOutputCache()   # release refs to the closed formats
         if globalref.genOptions['SaveTreeStates']:
             self.recentFiles.saveTreeState(localControl)
         if not self.localControls and not self.creatingLocalControlFlag:
@@ -51,6 +51,8 @@ class TreeModel(QAbstractItemModel):
                 spot = node.matchedSpot(fakeSpot)
                 return self.createIndex(row, column, spot)
             parentSpot = parentIndex.internalPointer()
+            if self.treeStructure.deferredBuild:
+                self.treeStructure.linkChildren(parentSpot.nodeRef)
             node = parentSpot.nodeRef.childList[row]
             return self.createIndex(row, column, node.matchedSpot(parentSpot))
         except IndexError:
@@ -79,6 +81,9 @@ class TreeModel(QAbstractItemModel):
         """
         try:
             parentSpot = parentIndex.internalPointer()
+            if self.treeStructure.deferredBuild:
+                # create the children shown before a large file is built
+                self.treeStructure.linkChildren(parentSpot.nodeRef)
             return parentSpot.nodeRef.numChildren()
         except AttributeError:
             # top level if no parentIndex
@@ -101,7 +106,7 @@ class TreeModel(QAbstractItemModel):
             return None
         node = spot.nodeRef
         if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
-            return node.title()
+            return node.title(spot)
         if (role == Qt.ItemDataRole.DecorationRole and
             globalref.genOptions['ShowTreeIcons']):
             return globalref.treeIcons.getIcon(node.formatRef.iconName, True)
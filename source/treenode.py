@@ -21,6 +21,25 @@ import nodeformat
 
 _replaceBackrefRe = (re.compile(r'\\(\d+)'), re.compile(r'\\g<(\d+)>'))
 _origBackrefMatch = None
+# new node IDs use a random per-session prefix plus a counter, with the same
+# 32 hex digit format as the uuid IDs stored in older files
+_idPrefix = uuid.uuid4().hex[:20]
+_idCounter = itertools.count()
+_treeOrderGeneration = 0   # changed when child lists may have been reordered
+
+
+def newNodeId():
+    """Return a unique ID string for a new node.
+
+    Much faster than generating a uuid for each node in bulk operations.
+    """
+    return '{0}{1:012x}'.format(_idPrefix, next(_idCounter))
+
+def treeOrderChanged():
+    """Invalidate the cached spot ranks after child lists may have changed.
+    """
+    global _treeOrderGeneration
+    _treeOrderGeneration += 1
 
 
 class TreeNode:
@@ -28,52 +47,69 @@ class TreeNode:
 
     Stores a data dict, lists of children and a format name string.
     Provides methods to get info on the structure and the data.
+    Uses slots to reduce memory use in large files.
     """
+    __slots__ = ('formatRef', 'uId', 'data', 'childList', 'spotRefs',
+                 'parentSpotDict', 'childPosDict', 'rankedSpotList',
+                 'titleCache')
+
     def __init__(self, formatRef, fileData=None):
         """Initialize a tree node.
 
         Arguments:
             formatRef -- a ref to this node's format info
-            fileData -- a dict with uid, data, child refs & parent refs
+            fileData -- a dict with uid & data (child refs are set separately)
         """
         self.formatRef = formatRef
         if not fileData:
             fileData = {}
-        self.uId = fileData.get('uid', uuid.uuid1().hex)
+        self.uId = fileData['uid'] if 'uid' in fileData else newNodeId()
         self.data = fileData.get('data', {})
-        self.tmpChildRefs = fileData.get('children', [])
         self.childList = []
         self.spotRefs = set()
+        # the next four are caches built when needed, None if not built
+        self.parentSpotDict = None   # spot refs stored by parent spot
+        self.childPosDict = None     # child list positions stored by node
+        self.rankedSpotList = None   # (generation, ranked spots, rank dict)
+        self.titleCache = None       # (format, generation, field data, title)
 
-    def assignRefs(self, nodeDict):
-        """Add actual refs to child nodes from data in self.tmpChildRefs.
+    def assignRefs(self, childIds, nodeDict):
+        """Add actual refs to child nodes from a list of child node IDs.
 
-        Any bad node refs (corrupt file data) are left in self.tmpChildRefs.
+        Any bad node refs (corrupt file data) are skipped.
+        Return True if all of the refs were valid.
         Arguments:
+            childIds -- a list of child uid strings from the file data
             nodeDict -- all nodes stored by uid
         """
         try:
-            self.childList = [nodeDict[uid] for uid in self.tmpChildRefs]
-            self.tmpChildRefs = []
+            self.childList = [nodeDict[uid] for uid in childIds]
+            return True
         except KeyError:   # due to corrupt file data
-            badChildRefs = []
-            for uid in self.tmpChildRefs:
-                if uid in nodeDict:
-                    self.childList.append(nodeDict[uid])
-                else:
-                    badChildRefs.append(uid)
-            self.tmpChildRefs = badChildRefs
+            self.childList = [nodeDict[uid] for uid in childIds
+                              if uid in nodeDict]
+            return False
 
     def generateSpots(self, parentSpot):
-        """Recursively generate spot references for this branch.
+        """Generate spot references for this branch.
 
+        Uses an explicit stack to avoid recursion limits in deep trees.
         Arguments:
             parentSpot -- the parent spot reference
         """
-        spot = treespot.TreeSpot(self, parentSpot)
-        self.spotRefs.add(spot)
-        for child in self.childList:
-            child.generateSpots(spot)
+        stack = [(self, parentSpot)]
+        while stack:
+            node, parentSpot = stack.pop()
+            spot = treespot.TreeSpot(node, parentSpot)
+            node.spotRefs.add(spot)
+            node.clearSpotCache()
+            stack.extend([(child, spot) for child in reversed(node.childList)])
+
+    def clearSpotCache(self):
+        """Clear cached spot lookups after spot refs are added or removed.
+        """
+        self.parentSpotDict = None
+        self.rankedSpotList = None
 
     def addSpotRef(self, parentNode, includeChildren=True):
         """Add a spot ref here to the given parent if not already there.
@@ -89,9 +125,11 @@ class TreeNode:
             if parentSpot not in origParentSpots:
                 self.spotRefs.add(treespot.TreeSpot(self, parentSpot))
                 changed = True
-        if changed and includeChildren:
-            for child in self.childList:
-                child.addSpotRef(self)
+        if changed:
+            self.clearSpotCache()
+            if includeChildren:
+                for child in self.childList:
+                    child.addSpotRef(self)
 
     def removeInvalidSpotRefs(self, includeChildren=True, forceDesend=False):
         """Verify existing spot refs and remove any that aren't valid.
@@ -106,27 +144,78 @@ class TreeNode:
                          spot.parentSpot in spot.parentSpot.nodeRef.spotRefs)}
         changed = len(self.spotRefs) != len(goodSpotRefs)
         self.spotRefs = goodSpotRefs
+        self.clearSpotCache()
         if includeChildren and (changed or forceDesend):
             for child in self.childList:
                 child.removeInvalidSpotRefs(includeChildren)
 
+    def rankedSpots(self):
+        """Return a list of this node's spots sorted by instance number.
+
+        Instance numbers follow tree order.  The list is cached until spot
+        refs are added or removed or child lists may have been reordered.
+        """
+        if len(self.spotRefs) <= 1:
+            return list(self.spotRefs)
+        return self.spotRankCache()[1]
+
+    def spotRank(self, spot):
+        """Return the instance number of one of this node's spots.
+
+        Raises ValueError if the spot is not in this node's spot refs.
+        Arguments:
+            spot -- the spot to find
+        """
+        if len(self.spotRefs) <= 1:
+            if spot in self.spotRefs:
+                return 0
+        else:
+            rank = self.spotRankCache()[2].get(spot)
+            if rank is not None:
+                return rank
+        raise ValueError('spot is not in the node spot list')
+
+    def spotRankCache(self):
+        """Return the cached (generation, spot list, rank dict) for clones.
+
+        Rebuilt after spot refs or the tree order may have changed.
+        """
+        cache = self.rankedSpotList
+        if (cache is None or cache[0] != _treeOrderGeneration or
+            len(cache[1]) != len(self.spotRefs)):
+            spotList = sorted(self.spotRefs,
+                              key=operator.methodcaller('sortKey'))
+            cache = (_treeOrderGeneration, spotList,
+                     {spot: rank for rank, spot in enumerate(spotList)})
+            self.rankedSpotList = cache
+        return cache
+
     def spotByNumber(self, num):
         """Return the spot at the given rank in the spot sequence.
 
         Arguments:
             num -- the rank number to return
         """
-        spotList = sorted(list(self.spotRefs),
-                          key=operator.methodcaller('sortKey'))
-        return spotList[num]
+        return self.rankedSpots()[num]
 
     def matchedSpot(self, parentSpot):
         """Return the spot for this node that matches a parent spot.
 
+        Cloned nodes use a parent spot dict, but the result is verified and
+        the dict is rebuilt in case spots were modified directly.
         Return None if not found.
         Arguments:
             parentSpot -- the parent to match
         """
+        if len(self.spotRefs) > 1:
+            if self.parentSpotDict is not None:
+                spot = self.parentSpotDict.get(parentSpot)
+                if (spot is not None and spot.parentSpot is parentSpot and
+                    spot in self.spotRefs):
+                    return spot
+            self.parentSpotDict = {spot.parentSpot: spot for spot in
+                                   self.spotRefs}
+            return self.parentSpotDict.get(parentSpot)
         for spot in self.spotRefs:
             if spot.parentSpot is parentSpot:
                 return spot
@@ -150,6 +239,28 @@ class TreeNode:
         except AttributeError:
             return set()
 
+    def childIndex(self, child):
+        """Return the position of the given child in this node's child list.
+
+        Uses the child position dict, which is checked against the child list
+        and rebuilt if the list was changed since it was last built.
+        Raises ValueError if the child is not found.
+        Arguments:
+            child -- the child node to find
+        """
+        if self.childPosDict is not None:
+            pos = self.childPosDict.get(child)
+            if (pos is not None and pos < len(self.childList) and
+                self.childList[pos] is child):
+                return pos
+        self.childPosDict = {}
+        for pos, node in enumerate(self.childList):
+            self.childPosDict.setdefault(node, pos)
+        try:
+            return self.childPosDict[child]
+        except KeyError:
+            raise ValueError('node is not in the child list')
+
     def numChildren(self):
         """Return number of children.
         """
@@ -159,11 +270,17 @@ class TreeNode:
         """Return a generator to step through all nodes in this branch.
 
         Includes self and closed nodes.
+        Uses a stack of child list iterators instead of nested generators.
         """
         yield self
-        for child in self.childList:
-            for node in child.descendantGen():
+        stack = [iter(self.childList)]
+        while stack:
+            for node in stack[-1]:
                 yield node
+                stack.append(iter(node.childList))
+                break
+            else:
+                stack.pop()
 
     def ancestors(self):
         """Return a set of all ancestor nodes (including self).
@@ -193,7 +310,24 @@ class TreeNode:
         Arguments:
             spotRef -- optional, used for ancestor field refs
         """
-        return self.formatRef.formatTitle(self, spotRef)
+        formatRef = self.formatRef
+        fieldNames = formatRef.titleFieldNames
+        if fieldNames is None:   # ancestor or other outside refs, no caching
+            return formatRef.formatTitle(self, spotRef)
+        # the cache is checked against the data, which is edited in many places
+        fieldData = tuple([self.data.get(name) for name in fieldNames])
+        cache = self.titleCache
+        if (cache and cache[0] is formatRef and
+            cache[1] == formatRef.generation and cache[2] == fieldData):
+            return cache[3]
+        title = formatRef.formatTitle(self, spotRef)
+        self.titleCache = (formatRef, formatRef.generation, fieldData, title)
+        return title
+
+    def clearTitleCache(self):
+        """Remove the cached title after data or type changes.
+        """
+        self.titleCache = None
 
     def setTitle(self, title):
         """Change this node's data based on a new title string.
@@ -202,6 +336,7 @@ class TreeNode:
         """
         if title == self.title():
             return False
+        self.titleCache = None
         return self.formatRef.extractTitleData(title, self.data)
 
     def output(self, plainText=False, keepBlanks=False, spotRef=None):
@@ -225,6 +360,7 @@ class TreeNode:
         """
         origTitle = self.title()
         self.formatRef = formatRef
+        self.titleCache = None
         formatRef.setInitDefaultData(self.data)
         if not formatRef.formatTitle(self):
             formatRef.extractTitleData(origTitle, self.data)
@@ -258,6 +394,7 @@ class TreeNode:
         if not newType and neutralResult:
             newType = neutralResult
         if newType and newType is not self.formatRef:
+            treeStructure.markChanged([self])
             self.changeDataType(newType)
             return True
         return False
@@ -437,7 +574,7 @@ class TreeNode:
         newNode = TreeNode(newFormat)
         pos = len(self.childList)
         if posRefNode:
-            pos = self.childList.index(posRefNode)
+            pos = self.childIndex(posRefNode)
             if not insertBefore:
                 pos += 1
         self.childList.insert(pos, newNode)
@@ -638,6 +775,7 @@ class TreeNode:
         newValue = self.formatRef.fieldDict[eqnFieldName].equationValue(self)
         if newValue != oldValue:
             self.data[eqnFieldName] = newValue
+            self.treeStructureRef().markMathValueChanged(self, eqnFieldName)
             changed = True
             for fieldRef in treeFormats.mathFieldRefDict.get(eqnFieldName, []):
                 for node in fieldRef.dependentEqnNodes(self):
@@ -14,10 +14,51 @@
 
 import re
 import itertools
+import collections
 from PyQt6.QtGui import QTextDocument
 import globalref
 
 _linkRe = re.compile(r'<a [^>]*href="#(.*?)"[^>]*>.*?</a>', re.I | re.S)
+_maxCachedOutputs = 20000
+# node output lines by node ID, stored with the format, generation & field data
+_outputCache = collections.OrderedDict()
+
+
+def cachedOutput(node, keepBlanks=False, spotRef=None):
+    """Return a list of formatted output lines, reusing cached lines if valid.
+
+    Entries are checked against the format generation and the node's field
+    data, so changed nodes and formats are rebuilt.  The least recently used
+    entries are dropped when the cache is full.  Outputs with ancestor, child
+    or file info fields are not cached.
+    Arguments:
+        node -- the node to get output for
+        keepBlanks -- if True, keep lines with empty fields
+        spotRef -- optional, used for ancestor field refs
+    """
+    nodeFormat = node.formatRef
+    fieldNames = nodeFormat.outputFieldNames
+    if fieldNames is None:
+        return node.output(keepBlanks=keepBlanks, spotRef=spotRef)
+    fieldData = tuple([node.data.get(name) for name in fieldNames])
+    key = (node.uId, keepBlanks)
+    entry = _outputCache.get(key)
+    if (entry and entry[0] is nodeFormat and
+        entry[1] == nodeFormat.generation and entry[2] == fieldData):
+        _outputCache.move_to_end(key)
+        return list(entry[3])
+    lines = node.output(keepBlanks=keepBlanks, spotRef=spotRef)
+    _outputCache[key] = (nodeFormat, nodeFormat.generation, fieldData,
+                         tuple(lines))
+    if len(_outputCache) > _maxCachedOutputs:
+        _outputCache.popitem(last=False)
+    return lines
+
+
+def clearOutputCache():
+    """Remove all cached output lines.
+    """
+    _outputCache.clear()
 
 
 class OutputItem:
@@ -39,9 +80,9 @@ class OutputItem:
             nodeFormat = node.formatRef
             if not nodeFormat.useTables:
                 self.textLines = [line + '<br />' for line in
-                                  node.output(spotRef=spot)]
+                                  cachedOutput(node, spotRef=spot)]
             else:
-                self.textLines = node.output(keepBlanks=True, spotRef=spot)
+                self.textLines = cachedOutput(node, True, spot)
             if not self.textLines:
                 self.textLines = ['']
             self.addSpace = nodeFormat.spaceBetween
@@ -280,8 +321,8 @@ class OutputGroup(list):
             spot -- the parent tree spot
             level -- the parent node's original indent level
         """
-        treeView = globalref.mainControl.activeControl.activeWindow.treeView
-        if not openOnly or treeView.isSpotExpanded(spot):
+        if not openOnly or (globalref.mainControl.activeControl.activeWindow.
+                            treeView.isSpotExpanded(spot)):
             for child in spot.childSpots():
                 self.append(OutputItem(child, level + 1))
                 self.addChildren(child, level + 1, openOnly)
@@ -13,7 +13,6 @@
 #******************************************************************************
 
 import sys
-import operator
 
 
 class TreeSpot:
@@ -21,7 +20,10 @@ class TreeSpot:
 
     Used to generate breadcrumb navigation and interface with tree views.
     A spot without a parent spot is an imaginary root spot, wihout a real node.
+    Uses slots to reduce memory use in large files.
     """
+    __slots__ = ('nodeRef', 'parentSpot')
+
     def __init__(self, nodeRef, parentSpot):
         """Initialize a tree spot.
 
@@ -46,16 +48,17 @@ class TreeSpot:
         Should never be called from the imaginary root spot.
         """
         try:
-            return self.parentSpot.nodeRef.childList.index(self.nodeRef)
+            return self.parentSpot.nodeRef.childIndex(self.nodeRef)
         except ValueError:
             return 0  #  avoid error message from interim view updates
 
     def instanceNumber(self):
         """Return this spot's rank in the node's spot list.
+
+        Ranks follow tree order, matching the spots generated when a file
+        is opened, so stored spot IDs stay valid in later sessions.
         """
-        spotList = sorted(list(self.nodeRef.spotRefs),
-                          key=operator.methodcaller('sortKey'))
-        return spotList.index(self)
+        return self.nodeRef.spotRank(self)
 
     def spotId(self):
         """Return a spot ID string, in the form "nodeID:spotInstance".
@@ -81,19 +84,23 @@ class TreeSpot:
         Includes self.
         """
         yield self
-        for childSpot in self.childSpots():
-            for spot in childSpot.spotDescendantGen():
-                yield spot
+        for spot in self.spotDescendantOnlyGen():
+            yield spot
 
     def spotDescendantOnlyGen(self):
         """Return a generator to step through the spots in this branch.
 
         Does not include self.
+        Uses a stack of child spot iterators instead of nested generators.
         """
-        for childSpot in self.childSpots():
-            yield childSpot
-            for spot in childSpot.spotDescendantGen():
+        stack = [iter(self.childSpots())]
+        while stack:
+            for spot in stack[-1]:
                 yield spot
+                stack.append(iter(spot.childSpots()))
+                break
+            else:
+                stack.pop()
 
     def expandedSpotDescendantGen(self, treeView):
         """Return a generator to step through expanded spots in this branch.
@@ -102,11 +109,15 @@ class TreeSpot:
         Arguments:
             treeView -- a ref to the treeview
         """
-        for childSpot in self.childSpots():
-            if treeView.isSpotExpanded(childSpot):
-                yield childSpot
-                for spot in childSpot.expandedSpotDescendantGen(treeView):
+        stack = [iter(self.childSpots())]
+        while stack:
+            for spot in stack[-1]:
+                if treeView.isSpotExpanded(spot):
                     yield spot
+                    stack.append(iter(spot.childSpots()))
+                    break
+            else:
+                stack.pop()
 
     def levelSpotDescendantGen(self, treeView, includeRoot=True, maxLevel=None,
                                openOnly=False, initLevel=0):
@@ -124,15 +135,20 @@ class TreeSpot:
         if includeRoot:
             yield (self, initLevel)
             initLevel += 1
-        if initLevel < maxLevel and (not openOnly or
-                                     treeView.isSpotExpanded(self)):
-            for childSpot in self.childSpots():
-                for spot, level in childSpot.levelSpotDescendantGen(treeView,
-                                                                    True,
-                                                                    maxLevel,
-                                                                    openOnly,
-                                                                    initLevel):
-                    yield (spot, level)
+        if initLevel >= maxLevel or (openOnly and
+                                     not treeView.isSpotExpanded(self)):
+            return
+        stack = [(iter(self.childSpots()), initLevel)]
+        while stack:
+            childIter, level = stack[-1]
+            for spot in childIter:
+                yield (spot, level)
+                if level + 1 < maxLevel and (not openOnly or
+                                             treeView.isSpotExpanded(spot)):
+                    stack.append((iter(spot.childSpots()), level + 1))
+                break
+            else:
+                stack.pop()
 
     def childSpots(self):
         """Return a list of immediate child spots.
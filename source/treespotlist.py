@@ -92,7 +92,7 @@ class TreeSpotList(list):
                 return False
             newStruct.replaceDuplicateIds(treeStruct.nodeDict)
             parent = spot.parentSpot.nodeRef
-            pos = parent.childList.index(spot.nodeRef)
+            pos = parent.childIndex(spot.nodeRef)
             if not insertBefore:
                 pos += 1
             treeStruct.addNodesFromStruct(newStruct, parent, pos)
@@ -162,7 +162,7 @@ class TreeSpotList(list):
                                      treeFormats=treeStruct.treeFormats)
         for spot in self:
             parent = spot.parentSpot.nodeRef
-            pos = parent.childList.index(spot.nodeRef)
+            pos = parent.childIndex(spot.nodeRef)
             if not insertBefore:
                 pos += 1
             for node in existNodes:
@@ -268,8 +268,7 @@ class TreeSpotList(list):
             node = spot.nodeRef
             oldParentSpot = spot.parentSpot
             newParentSpot = oldParentSpot.parentSpot
-            pos = (newParentSpot.nodeRef.childList.index(oldParentSpot.nodeRef)
-                   + 1)
+            pos = newParentSpot.nodeRef.childIndex(oldParentSpot.nodeRef) + 1
             node.changeParent(oldParentSpot, newParentSpot, pos)
             newSpots.append(node.matchedSpot(newParentSpot))
         return newSpots
@@ -287,7 +286,7 @@ class TreeSpotList(list):
             self.reverse()
         for spot in self:
             parent = spot.parentSpot.nodeRef
-            pos = parent.childList.index(spot.nodeRef)
+            pos = parent.childIndex(spot.nodeRef)
             del parent.childList[pos]
             pos = pos - 1 if up else pos + 1
             parent.childList.insert(pos, spot.nodeRef)
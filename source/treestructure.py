@@ -13,11 +13,14 @@
 #******************************************************************************
 
 import operator
+import heapq
+import gc
 import copy
 import json
-import uuid
 import treenode
+import treespot
 import treeformats
+import matheval
 import undo
 try:
     from __main__ import __version__
@@ -25,6 +28,9 @@ except ImportError:
     __version__ = ''
 
 defaultRootTitle = _('Main')
+debugSpots = False   # if True, check spot updates against a full rebuild
+# files with at least this many nodes can finish building after being shown
+deferMinNodes = 50000
 
 
 class TreeStructure(treenode.TreeNode):
@@ -33,7 +39,7 @@ class TreeStructure(treenode.TreeNode):
     Inherits TreeNode to get childList (holds top nodes) and other methods.
     """
     def __init__(self, fileData=None, topNodes=None, addDefaults=False,
-                 addSpots=True):
+                 addSpots=True, deferNodes=False, timer=None):
         """Create and store a tree structure from file data.
 
         If no file data is given, create an empty or a default new structure.
@@ -42,6 +48,10 @@ class TreeStructure(treenode.TreeNode):
             topNodes -- existing top-level nodes to add to a structure
             addDefaults -- if True, adds default new structure
             addSpots -- if True, adds parent spot references
+            deferNodes -- if True, build only the top nodes of a large file,
+                          leaving the rest for linkChildren() and
+                          buildDeferredNodes()
+            timer -- a PhaseTimer to record the build steps, if timing
         """
         super().__init__(None)  # init TreeNode, with no formatRef
         self.nodeDict = {}
@@ -50,25 +60,67 @@ class TreeStructure(treenode.TreeNode):
         self.configDialogFormats = None
         self.mathZeroBlanks = True
         self.childRefErrorNodes = []
+        # changes since the last full save or autosave journal entry
+        self.changedIds = set()     # IDs of nodes with changed file records
+        self.prevChildIds = {}      # parent ID: set of original child IDs
+        self.fullSaveNeeded = False # rewrite all records at the next save
+        # changes since the last math field update, kept separately
+        self.mathChangedIds = set()
+        self.mathPrevChildIds = {}
+        self.mathFullUpdate = True  # set to recalculate all math fields
+        self.mathRefDictUsed = None
+        self.mathZeroBlanksUsed = None
+        # math child field totals by parent ID, and their pending updates
+        self.childAggregates = {}
+        self.aggregateFieldNames = set()
+        self.aggregateChangedIds = set()
+        self.aggregateFieldChanges = set()   # (node ID, field name) tuples
+        self.aggregateParentIds = set()
+        self.aggregateRefDict = None
+        # a deferred build keeps the file records of all nodes, the IDs of
+        # created nodes with unlinked children and the nodes left to link
+        self.deferredBuild = False
+        self.pendingRecords = {}
+        self.unlinkedIds = set()
+        self.deferredStack = []
         if fileData:
-            self.treeFormats = treeformats.TreeFormats(fileData['formats'])
-            self.treeFormats.loadGlobalSavedConditions(fileData['properties'])
-            for nodeInfo in fileData['nodes']:
-                formatRef = self.treeFormats[nodeInfo['format']]
-                node = treenode.TreeNode(formatRef, nodeInfo)
-                self.nodeDict[node.uId] = node
-            for node in self.nodeDict.values():
-                node.assignRefs(self.nodeDict)
-                if node.tmpChildRefs:
-                    self.childRefErrorNodes.append(node)
-                    node.tmpChildRefs = []
-            for uId in fileData['properties']['topnodes']:
-                node = self.nodeDict[uId]
-                self.childList.append(node)
-            if 'zeroblanks' in fileData['properties']:
-                self.mathZeroBlanks = fileData['properties']['zeroblanks']
-            if addSpots:
-                self.generateSpots(None)
+            formatData = fileData['formats']
+            phase = timer.startPhase if timer else lambda name: None
+            phase('TreeFormats construction')
+            self.treeFormats = treeformats.TreeFormats(formatData)
+            phase('TreeNode creation')
+            # node records are decoded as needed from streamed files
+            nodeRecords = fileData['nodes']
+            if timer:
+                nodeRecords = timer.timedIter(nodeRecords, 'JSON parsing')
+            if deferNodes and addSpots:
+                nodeRecords = list(nodeRecords)
+                self.deferredBuild = len(nodeRecords) >= deferMinNodes
+            if self.deferredBuild:
+                self.startDeferredBuild(nodeRecords, fileData['properties'])
+            else:
+                childRefs = []
+                for nodeInfo in nodeRecords:
+                    formatRef = self.treeFormats[nodeInfo['format']]
+                    node = treenode.TreeNode(formatRef, nodeInfo)
+                    self.nodeDict[node.uId] = node
+                    childRefs.append((node, nodeInfo.get('children', [])))
+                phase('assignRefs')
+                for node, childIds in childRefs:
+                    if not node.assignRefs(childIds, self.nodeDict):
+                        self.childRefErrorNodes.append(node)
+                del childRefs
+                # properties follow the nodes in the file, for streamed reads
+                properties = fileData['properties']
+                self.treeFormats.loadGlobalSavedConditions(properties)
+                for uId in properties['topnodes']:
+                    node = self.nodeDict[uId]
+                    self.childList.append(node)
+                if 'zeroblanks' in properties:
+                    self.mathZeroBlanks = properties['zeroblanks']
+                if addSpots:
+                    phase('generateSpots')
+                    self.generateSpots(None)
         elif topNodes:
             self.childList = topNodes
             self.treeFormats = treeformats.TreeFormats()
@@ -91,29 +143,463 @@ class TreeStructure(treenode.TreeNode):
             self.treeFormats = treeformats.TreeFormats()
         self.fileInfoNode = treenode.TreeNode(self.treeFormats.fileInfoFormat)
 
-    def fileData(self):
+    def startDeferredBuild(self, nodeRecords, properties):
+        """Create the top nodes and their children from the file records.
+
+        The other nodes are created as their parents are linked.
+        Arguments:
+            nodeRecords -- a list of the file's node records
+            properties -- the file's properties dict
+        """
+        self.pendingRecords = {nodeInfo['uid']: nodeInfo for nodeInfo in
+                               nodeRecords}
+        self.treeFormats.loadGlobalSavedConditions(properties)
+        for uId in properties['topnodes']:
+            node = self.deferredNode(uId)
+            if not node:
+                raise KeyError(uId)
+            self.childList.append(node)
+        if 'zeroblanks' in properties:
+            self.mathZeroBlanks = properties['zeroblanks']
+        self.generateSpots(None)
+        for node in self.childList:
+            self.linkChildren(node)
+
+    def deferredNode(self, uId):
+        """Return the node with the given ID, creating it if needed.
+
+        Returns None if there is no node record with this ID.
+        Arguments:
+            uId -- the node ID to find
+        """
+        node = self.nodeDict.get(uId)
+        if not node:
+            nodeInfo = self.pendingRecords.get(uId)
+            if nodeInfo is None:
+                return None
+            node = treenode.TreeNode(self.treeFormats[nodeInfo['format']],
+                                     nodeInfo)
+            self.nodeDict[uId] = node
+            self.unlinkedIds.add(uId)
+            self.deferredStack.append(node)
+        return node
+
+    def linkChildren(self, node):
+        """Create and link a node's children during a deferred build.
+
+        Adds spots to the new children and to the descendants of children
+        already linked under another parent.  Does nothing if the node's
+        children are already linked.
+        Arguments:
+            node -- the parent node
+        """
+        if node.uId not in self.unlinkedIds:
+            return
+        self.unlinkedIds.remove(node.uId)
+        nodeDict = self.nodeDict
+        pendingRecords = self.pendingRecords
+        children = []
+        oldChildren = []
+        for uId in pendingRecords[node.uId].get('children', []):
+            child = nodeDict.get(uId)
+            if child:
+                oldChildren.append(child)
+            else:
+                nodeInfo = pendingRecords.get(uId)
+                if nodeInfo is None:
+                    if node not in self.childRefErrorNodes:
+                        self.childRefErrorNodes.append(node)
+                    continue
+                child = treenode.TreeNode(self.treeFormats[nodeInfo['format']],
+                                          nodeInfo)
+                nodeDict[uId] = child
+                child.spotRefs = {treespot.TreeSpot(child, parentSpot) for
+                                  parentSpot in node.spotRefs}
+                # leaves have nothing to link
+                if nodeInfo.get('children'):
+                    self.unlinkedIds.add(uId)
+                    self.deferredStack.append(child)
+            children.append(child)
+        node.childList = children
+        stack = [(node, oldChildren)]
+        while stack:
+            parent, children = stack.pop()
+            for child in children:
+                usedSpots = {spot.parentSpot for spot in child.spotRefs}
+                newSpots = [treespot.TreeSpot(child, parentSpot) for
+                            parentSpot in parent.spotRefs if
+                            parentSpot not in usedSpots]
+                if newSpots:
+                    child.spotRefs.update(newSpots)
+                    if child.uId not in self.unlinkedIds:
+                        stack.append((child, child.childList))
+
+    def buildDeferredNodes(self, maxNodes=0):
+        """Create and link the remaining nodes of a deferred build.
+
+        Return True when the build is complete, or False if about the
+        given number of nodes were created first.
+        Arguments:
+            maxNodes -- the number of nodes to create, 0 for no limit
+        """
+        stopSize = len(self.nodeDict) + maxNodes
+        while self.deferredStack:
+            self.linkChildren(self.deferredStack.pop())
+            if maxNodes and len(self.nodeDict) >= stopSize:
+                return False
+        # nodes that can't be reached are kept without spots, like a full
+        # build does
+        for uId in self.pendingRecords.keys() - self.nodeDict.keys():
+            self.deferredNode(uId)
+        while self.deferredStack:
+            self.linkChildren(self.deferredStack.pop())
+        # keep the file's node order
+        nodeDict = self.nodeDict
+        self.nodeDict = {uId: nodeDict[uId] for uId in self.pendingRecords}
+        if len(self.childRefErrorNodes) > 1:
+            positions = {uId: pos for pos, uId in
+                         enumerate(self.pendingRecords)}
+            self.childRefErrorNodes.sort(key=lambda node:
+                                         positions[node.uId])
+        self.pendingRecords = {}
+        self.deferredBuild = False
+        treenode.treeOrderChanged()
+        if debugSpots:
+            self.verifySpots()
+        return True
+
+    def fileData(self, copyData=False):
         """Return a fileData dict in JSON file format.
+
+        Arguments:
+            copyData -- if True, copy the node data dicts for a fixed snapshot
         """
         formats = self.treeFormats.storeFormats()
-        nodeList = sorted([node.fileData() for node in self.nodeDict.values()],
-                          key=operator.itemgetter('uid'))
+        nodeDict = self.nodeDict
+        # the garbage collector would repeatedly rescan the whole tree while
+        # the new records are built, so pause it until finished
+        gcEnabled = gc.isenabled()
+        gc.disable()
+        try:
+            # sorting the IDs is much faster than sorting the records by key
+            nodeList = [nodeDict[uId].fileData() for uId in sorted(nodeDict)]
+            if copyData:
+                for nodeRecord in nodeList:
+                    nodeRecord['data'] = nodeRecord['data'].copy()
+        finally:
+            if gcEnabled:
+                gc.enable()
+        fileData = {'formats': formats, 'nodes': nodeList,
+                    'properties': self.fileProperties()}
+        return fileData
+
+    def fileProperties(self):
+        """Return the properties dict for the JSON file format.
+        """
         topNodeIds = [node.uId for node in self.childList]
         properties = {'tlversion': __version__, 'topnodes': topNodeIds}
         self.treeFormats.storeGlobalSavedConditions(properties)
         if not self.mathZeroBlanks:
             properties['zeroblanks'] = False
-        fileData = {'formats': formats, 'nodes': nodeList,
-                    'properties': properties}
-        return fileData
+        return properties
+
+    def markChanged(self, nodes, childListChange=False):
+        """Record nodes whose file records are about to change.
+
+        Called from undo objects, before any change is made.  Other record
+        changes must also call this or markAllChanged, since incremental
+        database saves write only the recorded nodes.
+        Arguments:
+            nodes -- a list of nodes that will change
+            childListChange -- if True, the nodes' child lists may change
+        """
+        if childListChange:
+            treenode.treeOrderChanged()
+        for node in nodes:
+            self.changedIds.add(node.uId)
+            self.mathChangedIds.add(node.uId)
+            if self.childAggregates:
+                self.aggregateChangedIds.add(node.uId)
+                if childListChange:
+                    self.aggregateParentIds.add(node.uId)
+            if childListChange:
+                if node.uId not in self.prevChildIds:
+                    self.prevChildIds[node.uId] = {child.uId for child in
+                                                   node.childList}
+                # math keeps the nodes, since removed ones leave the node dict
+                if node.uId not in self.mathPrevChildIds:
+                    self.mathPrevChildIds[node.uId] = set(node.childList)
+
+    def markAllChanged(self):
+        """Record that all node records may change (for format changes).
+
+        Also requests a full rewrite at the next save in place of an
+        incremental database update.
+        """
+        self.changedIds.update(self.nodeDict.keys())
+        self.fullSaveNeeded = True
+
+    def clearChanges(self):
+        """Reset the change records after a full save.
+        """
+        self.changedIds = set()
+        self.prevChildIds = {}
+        self.fullSaveNeeded = False
+
+    def mathFullUpdateNeeded(self):
+        """Return True if all math fields need to be recalculated.
+
+        True after a file is loaded, after an explicit request and after
+        changes to the formats or to the zero blanks setting.
+        """
+        return (self.mathFullUpdate or
+                self.mathRefDictUsed is not self.treeFormats.mathFieldRefDict
+                or self.mathZeroBlanksUsed != self.mathZeroBlanks)
+
+    def clearMathChanges(self):
+        """Reset the math change records after the math fields are updated.
+        """
+        self.mathChangedIds = set()
+        self.mathPrevChildIds = {}
+        self.mathFullUpdate = False
+        self.mathRefDictUsed = self.treeFormats.mathFieldRefDict
+        self.mathZeroBlanksUsed = self.mathZeroBlanks
+
+    def updateChangedMathFields(self):
+        """Recalculate only the math fields affected by changes since the
+        last math update.
+
+        Starts with the equation nodes that reference the changed nodes and
+        the nodes moved to new parents.  Equation levels are evaluated in
+        the mathLevelList order, by depth within each level, so referenced
+        values are always updated first.  Changed results add their own
+        dependent equation nodes.
+        Return True if any data was changed.
+        """
+        mathFieldRefDict = self.treeFormats.mathFieldRefDict
+        dirtyNodes = set()
+        for uId in self.mathChangedIds:
+            node = self.nodeDict.get(uId)
+            if node:
+                dirtyNodes.add(node)
+                dirtyNodes.update(self.mathDependentNodes(node))
+        refPrefixes = {fieldRef.tagPrefix for fieldRefs in
+                       mathFieldRefDict.values() for fieldRef in fieldRefs}
+        hasFirstSpotRefs = bool(refPrefixes & {'*', '$'})
+        if self.mathPrevChildIds and hasFirstSpotRefs:
+            # reordered branches may change the first parent of clones
+            dirtyNodes.update(node for node in self.nodeDict.values()
+                              if len(node.spotRefs) > 1)
+        for uId, prevChildren in self.mathPrevChildIds.items():
+            parent = self if uId == self.uId else self.nodeDict.get(uId)
+            if not parent:
+                continue
+            # moved nodes and clones that may have a new first parent,
+            # including remaining clones inside removed branches
+            for node in set(parent.childList) ^ prevChildren:
+                if hasFirstSpotRefs:
+                    dirtyNodes.update(child for child in node.descendantGen()
+                                      if child.spotRefs)
+                elif node.spotRefs:
+                    dirtyNodes.add(node)
+        changed = False
+        for eqnRefDict in self.treeFormats.mathLevelList:
+            upward = (list(eqnRefDict.values())[0][0].evalDirection ==
+                      matheval.EvalDir.upward)
+            queue = []
+            doneNodes = set()
+            for node in dirtyNodes:
+                if node.formatRef.name in eqnRefDict:
+                    self.pushMathNode(queue, node, upward)
+            while queue:
+                node = heapq.heappop(queue)[-1]
+                if node in doneNodes:
+                    continue
+                doneNodes.add(node)
+                for eqnRef in eqnRefDict[node.formatRef.name]:
+                    fieldName = eqnRef.eqnField.name
+                    if not self.setMathValue(node, fieldName,
+                                             eqnRef.eqnField.
+                                             equationValue(node)):
+                        continue
+                    changed = True
+                    for fieldRef in mathFieldRefDict.get(fieldName, []):
+                        for depNode in fieldRef.dependentEqnNodes(node):
+                            dirtyNodes.add(depNode)
+                            if (depNode not in doneNodes and
+                                depNode.formatRef.name in eqnRefDict):
+                                self.pushMathNode(queue, depNode, upward)
+        self.clearMathChanges()
+        return changed
+
+    def setMathValue(self, node, fieldName, value):
+        """Store a recalculated math field value and record it if changed.
+
+        Return True if the stored value was changed.
+        Arguments:
+            node -- the node with the math field
+            fieldName -- the name of the math field
+            value -- the new stored value
+        """
+        if node.data.get(fieldName) == value:
+            return False
+        node.data[fieldName] = value
+        self.markMathValueChanged(node, fieldName)
+        return True
+
+    def markMathValueChanged(self, node, fieldName):
+        """Record a changed math field value for saves and child aggregates.
+
+        Arguments:
+            node -- the node with the changed math field
+            fieldName -- the name of the changed field
+        """
+        self.changedIds.add(node.uId)
+        if fieldName in self.aggregateFieldNames:
+            self.aggregateFieldChanges.add((node.uId, fieldName))
+
+    def childAggregate(self, parent, fieldName, zeroBlanks=True,
+                       noMarkup=True):
+        """Return an up-to-date ChildAggregate for a parent's child field.
+
+        Creates the aggregate if it doesn't exist yet.
+        Arguments:
+            parent -- the node with the children
+            fieldName -- the name of the child field to total
+            zeroBlanks -- replace blank fields with zeros if True
+            noMarkup -- if true, remove html markup
+        """
+        if self.aggregateRefDict is not self.treeFormats.mathFieldRefDict:
+            # formats changed, so field types may differ
+            self.clearChildAggregates()
+            self.aggregateRefDict = self.treeFormats.mathFieldRefDict
+        self.updateChildAggregates()
+        aggregates = self.childAggregates.setdefault(parent.uId, {})
+        key = (fieldName, zeroBlanks, noMarkup)
+        aggregate = aggregates.get(key)
+        if aggregate:
+            aggregate.parent = parent
+        else:
+            aggregate = matheval.ChildAggregate(parent, fieldName, zeroBlanks,
+                                                noMarkup)
+            aggregates[key] = aggregate
+            self.aggregateFieldNames.add(fieldName)
+        return aggregate
+
+    def updateChildAggregates(self):
+        """Apply the pending child list and value changes to the aggregates.
+        """
+        for uId in self.aggregateParentIds:
+            aggregates = self.childAggregates.get(uId)
+            if aggregates:
+                parent = self if uId == self.uId else self.nodeDict.get(uId)
+                if not parent:
+                    del self.childAggregates[uId]
+                    continue
+                for aggregate in aggregates.values():
+                    aggregate.parent = parent
+                    aggregate.updateChildList()
+        changes = [(uId, None) for uId in self.aggregateChangedIds]
+        changes.extend((uId, fieldName) for uId, fieldName in
+                       self.aggregateFieldChanges if uId not in
+                       self.aggregateChangedIds)
+        for uId, fieldName in changes:
+            node = self.nodeDict.get(uId)
+            if node:
+                for spot in node.spotRefs:
+                    if spot.parentSpot:
+                        aggregates = self.childAggregates.get(spot.parentSpot.
+                                                              nodeRef.uId, {})
+                        for key, aggregate in aggregates.items():
+                            if not fieldName or key[0] == fieldName:
+                                aggregate.updateChild(node)
+        self.aggregateParentIds = set()
+        self.aggregateChangedIds = set()
+        self.aggregateFieldChanges = set()
+
+    def clearChildAggregates(self):
+        """Remove all child aggregates, so they are rebuilt when needed.
+        """
+        self.childAggregates = {}
+        self.aggregateFieldNames = set()
+        self.aggregateParentIds = set()
+        self.aggregateChangedIds = set()
+        self.aggregateFieldChanges = set()
+
+    def mathDependentNodes(self, node):
+        """Return a set of equation nodes that may reference the given node.
+
+        Child references are always included, since the node's previous
+        type may have had the referenced fields.
+        Arguments:
+            node -- the changed node
+        """
+        fieldNames = set(node.formatRef.fieldDict.keys()) | set(node.data)
+        depNodes = set()
+        for fieldName, fieldRefs in (self.treeFormats.mathFieldRefDict.
+                                     items()):
+            hasField = fieldName in fieldNames
+            for fieldRef in fieldRefs:
+                if hasField or fieldRef.tagPrefix in ('&', '#'):
+                    depNodes.update(fieldRef.dependentEqnNodes(node))
+        return depNodes
+
+    def pushMathNode(self, queue, node, upward):
+        """Add a node to the math update priority queue.
+
+        Nodes are ordered by their deepest spot, so that parents come before
+        children, or children before parents for upward evaluations.
+        Arguments:
+            queue -- the heap list
+            node -- the equation node to add
+            upward -- if True, deeper nodes come first
+        """
+        depth = max((len(spot.spotChain()) for spot in node.spotRefs),
+                    default=0)
+        heapq.heappush(queue, (-depth if upward else depth, id(node), node))
+
+    def journalData(self, clearChanges=True):
+        """Return a fileData dict with only the nodes changed since last call.
+
+        Includes changed nodes and the full branches of children added to
+        changed parents.  Removed nodes are left out, since they are no longer
+        reachable from the top nodes when the journal is replayed.
+        Arguments:
+            clearChanges -- if True, reset the change records
+        """
+        nodeRecords = {}
+        for uId in self.changedIds:
+            node = self if uId == self.uId else self.nodeDict.get(uId)
+            if not node:
+                continue
+            if node is not self:
+                nodeRecords[uId] = node.fileData()
+            prevChildIds = self.prevChildIds.get(uId)
+            if prevChildIds is not None:
+                for child in node.childList:
+                    if child.uId not in prevChildIds:
+                        for newNode in child.descendantGen():
+                            if newNode.uId not in nodeRecords:
+                                nodeRecords[newNode.uId] = newNode.fileData()
+        if clearChanges:
+            self.clearChanges()
+        nodeList = sorted(nodeRecords.values(),
+                          key=operator.itemgetter('uid'))
+        return {'formats': self.treeFormats.storeFormats(),
+                'nodes': nodeList, 'properties': self.fileProperties()}
 
     def purgeOldFieldData(self):
         """Remove data from obsolete fields from all nodes.
+
+        The changed nodes are recorded for incremental database saves.
         """
         fieldSets = self.treeFormats.fieldNameDict()
         for node in self.nodeDict.values():
             oldKeys = set(node.data.keys()) - fieldSets[node.formatRef.name]
             for key in oldKeys:
                 del node.data[key]
+            if oldKeys:
+                self.changedIds.add(node.uId)
 
     def addNodeDictRef(self, node):
         """Add the given node to the node dictionary.
@@ -148,13 +634,83 @@ class TreeStructure(treenode.TreeNode):
             removeUnusedNodes -- if True, delete refs to nodes without spots
         """
         self.spotRefs = set()
+        self.clearSpotCache()
         for node in self.nodeDict.values():
             node.spotRefs = set()
+            node.clearSpotCache()
         self.generateSpots(None)
         if removeUnusedNodes:
             self.nodeDict = {uId:node for (uId, node) in self.nodeDict.items()
                              if node.spotRefs}
 
+    def updateChildSpots(self, changeList):
+        """Patch spot refs and the node dict after child lists were replaced.
+
+        Only branches added to or removed from the given parents are updated,
+        so the cost depends on the size of the change, not of the tree.
+        Arguments:
+            changeList -- a list of (parent node, previous child list) tuples
+        """
+        treenode.treeOrderChanged()
+        newNodes = set()
+        oldNodes = set()
+        for parent, prevChildList in changeList:
+            prevChildren = set(prevChildList)
+            children = set(parent.childList)
+            newNodes = newNodes | (children - prevChildren)
+            oldNodes = oldNodes | (prevChildren - children)
+        oldBranchNodes = set()
+        for oldNode in oldNodes:
+            oldBranchNodes.update(oldNode.descendantGen())
+            oldNode.removeInvalidSpotRefs()
+        for parent, prevChildList in changeList:
+            for child in parent.childList:
+                if child in newNodes:
+                    child.addSpotRef(parent)
+        for node in oldBranchNodes:
+            if not node.spotRefs:
+                self.removeNodeDictRef(node)
+        for newNode in newNodes:
+            for node in newNode.descendantGen():
+                self.addNodeDictRef(node)
+        if debugSpots:
+            self.verifySpots()
+
+    def verifySpots(self):
+        """Compare spot refs and the node dict with a full rebuild.
+
+        Reports differences to std output and returns True if none are found.
+        Used to check incremental spot updates when debugSpots is set.
+        """
+        expectedPaths = {}
+        stack = [(child, (child,)) for child in reversed(self.childList)]
+        while stack:
+            node, path = stack.pop()
+            expectedPaths.setdefault(node, set()).add(path)
+            stack.extend([(child, path + (child,)) for child in
+                          reversed(node.childList)])
+        errorCount = 0
+        for node, paths in expectedPaths.items():
+            spotPaths = {tuple(spot.nodeRef for spot in spot.spotChain())
+                         for spot in node.spotRefs}
+            if (spotPaths != paths or
+                len(node.spotRefs) != len(node.rankedSpots())):
+                print('    Spot mismatch in node, ID: {}, Title: {}'.
+                      format(node.uId, node.title()))
+                errorCount += 1
+            if self.nodeDict.get(node.uId) is not node:
+                print('    Node not in nodeDict, ID: {}, Title: {}'.
+                      format(node.uId, node.title()))
+                errorCount += 1
+        for uId in (set(self.nodeDict.keys()) -
+                    {node.uId for node in expectedPaths}):
+            print('    Node not in structure, ID: {}'.format(uId))
+            errorCount += 1
+        if errorCount:
+            print('  {} errors found in incremental spot update'.
+                  format(errorCount))
+        return errorCount == 0
+
     def deleteNodeSpot(self, spot):
         """Remove the given spot, removing the entire node if no spots remain.
 
@@ -163,11 +719,13 @@ class TreeStructure(treenode.TreeNode):
         """
         spot.parentSpot.nodeRef.childList.remove(spot.nodeRef)
         for node in spot.nodeRef.descendantGen():
-            if len(node.spotRefs) <= 1:
-                self.removeNodeDictRef(node)
-                node.spotRefs = set()
-            else:
+            if len(node.spotRefs) > 1:
                 node.removeInvalidSpotRefs(False)
+                if node.spotRefs:
+                    continue
+            self.removeNodeDictRef(node)
+            node.spotRefs = set()
+            node.clearSpotCache()
 
     def structSpot(self):
         """Return the top spot (not tied to a node).
@@ -200,6 +758,16 @@ class TreeStructure(treenode.TreeNode):
             for node in child.descendantGen():
                 yield node
 
+    def nodesByType(self):
+        """Return a dict of node lists in tree order by type name.
+
+        Clones are only included once.
+        """
+        typeNodes = {}
+        for node in dict.fromkeys(self.descendantGen()):
+            typeNodes.setdefault(node.formatRef.name, []).append(node)
+        return typeNodes
+
     def getConfigDialogFormats(self, forceReset=False):
         """Return duplicate formats for use in the config dialog.
 
@@ -218,9 +786,14 @@ class TreeStructure(treenode.TreeNode):
         if addUndo:
             undo.FormatUndo(self.undoList, self.treeFormats,
                             self.configDialogFormats)
+        # renames change node records, also when undo restores the formats
+        recordsChanged = bool(self.configDialogFormats.fieldRenameDict or
+                              self.configDialogFormats.typeRenameDict)
         self.treeFormats.copySettings(self.configDialogFormats)
         self.treeFormats.updateDerivedRefs()
         self.treeFormats.updateMathFieldRefs()
+        if recordsChanged or self.treeFormats.emptiedMathDict:
+            self.markAllChanged()
         if self.configDialogFormats.fieldRenameDict:
             for node in self.nodeDict.values():
                 fieldRenameDict = (self.configDialogFormats.fieldRenameDict.
@@ -261,7 +834,7 @@ class TreeStructure(treenode.TreeNode):
         for node in list(self.nodeDict.values()):
             if node.uId in duplicateDict:
                 del self.nodeDict[node.uId]
-                node.uId = uuid.uuid1().hex
+                node.uId = treenode.newNodeId()
                 self.nodeDict[node.uId] = node
 
     def addNodesFromStruct(self, treeStruct, parent, position=-1):
@@ -135,6 +135,7 @@ class DataUndo(UndoBase):
             len(listRef[-1].dataList) == 1 and len(nodes) == 1 and
             nodes[0] == listRef[-1].dataList[0][0] and
             fieldRef == listRef[-1].dataList[0][2]):
+            self.treeStructRef.markChanged(nodes)
             return
         for node in nodes:
             if addBranch:
@@ -145,6 +146,7 @@ class DataUndo(UndoBase):
                 if addChildren:
                     for child in node.childList:
                         self.dataList.append((child, child.data.copy(), ''))
+        self.treeStructRef.markChanged([data[0] for data in self.dataList])
         listRef.addUndoObj(self, notRedo)
 
     def undo(self, redoRef):
@@ -158,6 +160,7 @@ class DataUndo(UndoBase):
                      False, False, '', False)
         for node, data, fieldRef in self.dataList:
             node.data = data
+            node.clearTitleCache()
 
 
 class ChildListUndo(UndoBase):
@@ -183,6 +186,7 @@ class ChildListUndo(UndoBase):
         if (skipSame and listRef and isinstance(listRef[-1], ChildListUndo)
             and len(listRef[-1].dataList) == 1 and len(nodes) == 1 and
             nodes[0] == listRef[-1].dataList[0][0]):
+            self.treeStructRef.markChanged(nodes, True)
             return
         self.addBranch = addBranch
         self.treeFormats = None
@@ -194,6 +198,8 @@ class ChildListUndo(UndoBase):
                     self.dataList.append((child, child.childList[:]))
             else:
                 self.dataList.append((node, node.childList[:]))
+        self.treeStructRef.markChanged([data[0] for data in self.dataList],
+                                       True)
         listRef.addUndoObj(self, notRedo)
 
     def undo(self, redoRef):
@@ -212,22 +218,11 @@ class ChildListUndo(UndoBase):
             self.treeStructRef.configDialogFormats = self.treeFormats
             self.treeStructRef.applyConfigDialogFormats(False)
             globalref.mainControl.updateConfigDialog()
-        newNodes = set()
-        oldNodes = set()
-        for node, childList in self.dataList:
-            origChildren = set(node.childList)
-            children = set(childList)
-            newNodes = newNodes | (children - origChildren)
-            oldNodes = oldNodes | (origChildren - children)
+        changeList = []
         for node, childList in self.dataList:
+            changeList.append((node, node.childList))
             node.childList = childList
-        self.treeStructRef.rebuildNodeDict()  # slow but reliable
-        for oldNode in oldNodes:
-            oldNode.removeInvalidSpotRefs()
-        for node, childList in self.dataList:
-            for child in childList:
-                if child in newNodes:
-                    child.addSpotRef(node)
+        self.treeStructRef.updateChildSpots(changeList)
 
 
 class ChildDataUndo(UndoBase):
@@ -262,6 +257,8 @@ class ChildDataUndo(UndoBase):
                 for node in parent.childList:
                     self.dataList.append((node, node.data.copy(),
                                           node.childList[:]))
+        self.treeStructRef.markChanged([data[0] for data in self.dataList],
+                                       True)
         listRef.addUndoObj(self, notRedo)
 
     def undo(self, redoRef):
@@ -290,6 +287,7 @@ class ChildDataUndo(UndoBase):
         for node, data, childList in self.dataList:
             node.childList = childList
             node.data = data
+            node.clearTitleCache()
         self.treeStructRef.rebuildNodeDict()  # slow but reliable
         for newNode in newNodes.copy():
             for child in newNode.descendantGen():
@@ -321,6 +319,7 @@ class TypeUndo(UndoBase):
             nodes = [nodes]
         for node in nodes:
             self.dataList.append((node, node.formatRef.name, node.data.copy()))
+        self.treeStructRef.markChanged(nodes)
         listRef.addUndoObj(self, notRedo)
 
     def undo(self, redoRef):
@@ -334,6 +333,7 @@ class TypeUndo(UndoBase):
         for node, formatName, data in self.dataList:
             node.formatRef = self.treeStructRef.treeFormats[formatName]
             node.data = data
+            node.clearTitleCache()
 
 
 class FormatUndo(UndoBase):
@@ -363,6 +363,8 @@ class FormatUndo(UndoBase):
                 self.treeFormats.fieldRenameDict[oldName] = (self.treeFormats.
                                                       fieldRenameDict[newName])
                 del self.treeFormats.fieldRenameDict[newName]
+        # renamed fields & types change the records of any node
+        self.treeStructRef.markAllChanged()
         listRef.addUndoObj(self, notRedo)
 
     def undo(self, redoRef):